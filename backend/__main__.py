@@ -0,0 +1,86 @@
+"""
+Ponto de entrada único do AlertSystem
+
+    python -m backend serve      API + frontend (--monitor: monitor no mesmo processo)
+    python -m backend monitor    monitor de alertas (ou --replay START END)
+    python -m backend bench      benchmarks e orçamento de cold start
+    python -m backend loadtest   teste de carga local (API, escritor, monitor e stub do EmailJS)
+
+Os módulos de cada subcomando são importados só quando usados.
+"""
+import argparse
+import sys
+
+def build_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(prog='python -m backend', description='AlertSystem')
+    parser.add_argument('--db', help='caminho do banco de dados (padrão: SISTEMA_DB_PATH > real-time > local)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    serve = subparsers.add_parser('serve', help='run the API server')
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=5555)
+    serve.add_argument('--debug', action='store_true')
+    serve.add_argument('--monitor', action='store_true',
+                       help='run the alert monitor inside the API process (single-process mode)')
+    
+    monitor = subparsers.add_parser('monitor', help='run the alert monitor')
+    monitor.add_argument('--replay', nargs=2, metavar=('START', 'END'),
+                         help="replay active rules over historical readings ('YYYY-MM-DD HH:MM:SS') without sending emails")
+    
+    bench = subparsers.add_parser('bench', help='run benchmarks')
+    bench.add_argument('--runs', type=int, default=5)
+    
+    loadtest = subparsers.add_parser('loadtest', help='run a local load test (no network needed)')
+    loadtest.add_argument('--duration', type=float, default=30, help='seconds')
+    loadtest.add_argument('--clients', type=int, default=8, help='concurrent dashboard clients')
+    loadtest.add_argument('--write-rate', type=float, default=5, help='sistema_info rows per second')
+    loadtest.add_argument('--phase-seconds', type=float, default=5, help='length of each normal/spike phase')
+    loadtest.add_argument('--email-latency-ms', type=float, default=200)
+    loadtest.add_argument('--email-error-rate', type=float, default=0.05)
+    
+    return parser
+
+def main(argv=None):
+    """Parse arguments, resolve the configuration once and run the chosen command"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.command == 'bench':
+        from .bench import run_benchmarks
+        return 0 if run_benchmarks(args.runs) else 1
+    
+    if args.command == 'loadtest':
+        from .loadtest import print_loadtest_report, run_loadtest
+        print_loadtest_report(run_loadtest(
+            duration=args.duration, clients=args.clients, write_rate=args.write_rate,
+            phase_seconds=args.phase_seconds, email_latency_ms=args.email_latency_ms,
+            email_error_rate=args.email_error_rate
+        ))
+        return 0
+    
+    from .config import configure, print_config
+    configure(args.db)
+    print_config()
+    
+    if args.command == 'serve':
+        from .app import app
+        if args.monitor:
+            from .alert_monitor import start_embedded_monitor
+            start_embedded_monitor()
+        # O reloader do modo debug reiniciaria o processo e duplicaria o monitor embutido
+        app.run(host=args.host, port=args.port, debug=args.debug, use_reloader=args.debug and not args.monitor)
+    elif args.command == 'monitor':
+        from . import alert_monitor
+        if args.replay:
+            try:
+                start, end = alert_monitor.parse_replay_range(*args.replay)
+            except ValueError as e:
+                parser.error(str(e))
+            alert_monitor.print_replay_report(alert_monitor.replay_alerts(start, end))
+        else:
+            alert_monitor.monitor_alerts()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,7 @@
+import heapq
+import threading
+from bisect import bisect_right
 import time
-import requests
 from datetime import datetime, timedelta
 from . import db_manager
 from .config import (
@@ -8,25 +10,122 @@ from .config import (
     EMAILJS_PUBLIC_KEY, 
     EMAILJS_PRIVATE_KEY,
     EMAILJS_API_URL,
+    EMAILJS_TIMEOUT,
     CHECK_INTERVAL,
     READING_WINDOW_MINUTES
 )
 
-def check_condition(value, condition, threshold_value, threshold_max=None):
-    """Check if a value meets the alert condition"""
+# Map sensor type to database column
+METRIC_COLUMNS = {
+    'cpu': 'cpu',
+    'ram': 'ram',
+    'temperatura': 'temperatura',
+    'temperature': 'temperatura',
+    'potencia': 'potencia',
+    'power': 'potencia'
+}
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def get_metric_column(metric):
+    """Return the sistema_info column for a rule metric, or None if unknown"""
+    return METRIC_COLUMNS.get((metric or '').lower())
+
+def compile_condition(condition, threshold_value, threshold_max=None):
+    """Return a predicate value -> bool for a fixed rule condition"""
     if condition == 'greater_than':
-        return value > threshold_value
+        return lambda value: value > threshold_value
     elif condition == 'less_than':
-        return value < threshold_value
-    elif condition == 'between':
-        if threshold_max is None:
-            return False
-        return threshold_value <= value <= threshold_max
-    elif condition == 'outside':
-        if threshold_max is None:
-            return False
-        return value < threshold_value or value > threshold_max
-    return False
+        return lambda value: value < threshold_value
+    elif condition == 'between' and threshold_max is not None:
+        return lambda value: threshold_value <= value <= threshold_max
+    elif condition == 'outside' and threshold_max is not None:
+        return lambda value: value < threshold_value or value > threshold_max
+    return lambda value: False
+
+def compile_recovery(condition, threshold_value, threshold_max=None, hysteresis=0):
+    """Return a predicate value -> bool telling when a firing rule has recovered
+
+    The value must be back on the safe side of the threshold by at least
+    `hysteresis`, so readings hovering around the threshold do not flap.
+    """
+    hysteresis = hysteresis or 0
+    if condition == 'greater_than':
+        return lambda value: value < threshold_value - hysteresis
+    elif condition == 'less_than':
+        return lambda value: value > threshold_value + hysteresis
+    elif condition == 'between' and threshold_max is not None:
+        return lambda value: value < threshold_value - hysteresis or value > threshold_max + hysteresis
+    elif condition == 'outside' and threshold_max is not None:
+        return lambda value: threshold_value + hysteresis <= value <= threshold_max - hysteresis
+    return lambda value: False
+
+def check_condition(value, condition, threshold_value, threshold_max=None):
+    """Check if a value meets the alert condition"""
+    return compile_condition(condition, threshold_value, threshold_max)(value)
+
+def get_cooldown_end(last_alert_time, cooldown_minutes):
+    """Return when a rule leaves cooldown, or None if it never alerted"""
+    if last_alert_time is None:
+        return None
+    return last_alert_time + timedelta(minutes=cooldown_minutes)
+
+class RuleLifecycle:
+    """ok -> firing -> ok state machine of one rule, shared by monitor_alerts and replay_alerts
+
+    Readings are fed in ascending timestamp order. An 'ok' rule fires on the
+    first violating reading at or after `cooldown_until`; a firing rule resolves
+    on the first reading past the hysteresis margin. Readings at or before
+    `since` (the reading that caused the last transition) were already evaluated
+    and are skipped, so overlapping batches never fire twice for one incident.
+    Violations and the peak violating value are tallied for reports.
+    """
+    __slots__ = ('is_violated', 'is_recovered', 'cooldown', 'lowest_is_peak',
+                 'firing', 'since', 'cooldown_until', 'violations', 'peak')
+    
+    def __init__(self, rule, firing=False, since='', cooldown_until=''):
+        self.is_violated = compile_condition(rule['condition'], rule['threshold_value'], rule.get('threshold_max'))
+        self.is_recovered = compile_recovery(rule['condition'], rule['threshold_value'], rule.get('threshold_max'), rule.get('hysteresis'))
+        self.cooldown = timedelta(minutes=int(rule.get('cooldown_minutes') or 0))
+        self.lowest_is_peak = rule['condition'] == 'less_than'  # pico = menor valor para regras "menor que"
+        self.firing = firing
+        self.since = since or ''
+        # Strings ordenáveis no mesmo formato dos timestamps das leituras
+        self.cooldown_until = cooldown_until or ''
+        self.violations = 0
+        self.peak = None
+    
+    def advance(self, timestamps, values):
+        """Feed readings (ascending) and return the transitions as (event, timestamp, value) tuples"""
+        is_violated, is_recovered = self.is_violated, self.is_recovered
+        firing, since, cooldown_until = self.firing, self.since, self.cooldown_until
+        lowest_is_peak, peak, violations = self.lowest_is_peak, self.peak, 0
+        events = []
+        # Entrada em ordem crescente: as leituras já avaliadas formam um prefixo
+        first = bisect_right(timestamps, since) if since else 0
+        if first:
+            timestamps, values = timestamps[first:], values[first:]
+        # NaN (leitura sem valor) nunca satisfaz as comparações das condições
+        for timestamp, value in zip(timestamps, values):
+            if not is_violated(value):
+                if firing and is_recovered(value):
+                    firing = False
+                    since = timestamp
+                    events.append(('resolved', timestamp, value))
+                continue
+            violations += 1
+            if peak is None or (value < peak if lowest_is_peak else value > peak):
+                peak = value
+            if firing or timestamp < cooldown_until:
+                continue
+            firing = True
+            since = timestamp
+            cooldown_until = (datetime.fromisoformat(timestamp) + self.cooldown).strftime(TIMESTAMP_FORMAT)
+            events.append(('triggered', timestamp, value))
+        self.firing, self.since, self.cooldown_until = firing, since, cooldown_until
+        self.violations += violations
+        self.peak = peak
+        return events
 
 def send_email_via_emailjs(recipient_email, subject, message):
     """Send email via EmailJS"""
@@ -47,7 +146,9 @@ def send_email_via_emailjs(recipient_email, subject, message):
             }
         }
         
-        response = requests.post(EMAILJS_API_URL, json=payload)
+        import requests  # importado sob demanda: só o envio de email precisa dele
+        
+        response = requests.post(EMAILJS_API_URL, json=payload, timeout=EMAILJS_TIMEOUT)
         
         if response.status_code == 200:
             print(f"Email sent successfully to {recipient_email}")
@@ -71,117 +172,331 @@ def format_condition_text(condition, threshold_value, threshold_max=None):
         return f"outside {threshold_value} - {threshold_max}"
     return ""
 
+# Cache em memória das regras ativas, usado quando o monitor roda dentro do servidor da API
+# (modo processo único): os handlers de CRUD invalidam o cache e acordam o monitor.
+_rules_cache_enabled = False
+_rules_cache = None
+_rules_cache_lock = threading.Lock()
+_wakeup = threading.Event()
+_stop = threading.Event()
+
+def get_active_rules():
+    """Return active rules, from the in-memory cache when it is enabled"""
+    global _rules_cache
+    if not _rules_cache_enabled:
+        return db_manager.get_active_alert_rules()
+    with _rules_cache_lock:
+        if _rules_cache is None:
+            _rules_cache = db_manager.get_active_alert_rules()
+        return _rules_cache
+
+def invalidate_rules_cache():
+    """Drop cached rules and wake the monitor so rule edits take effect immediately"""
+    global _rules_cache
+    with _rules_cache_lock:
+        _rules_cache = None
+    _wakeup.set()
+
+def wait_next_check(seconds=CHECK_INTERVAL):
+    """Sleep until the next check, returning True early if the rules changed"""
+    woken = _wakeup.wait(max(seconds, 0))
+    _wakeup.clear()
+    return woken
+
+def stop_monitor():
+    """Ask a running monitor loop to exit after its current check"""
+    _stop.set()
+    _wakeup.set()
+
+def start_embedded_monitor():
+    """Run the monitor as a daemon thread inside the current (API) process"""
+    global _rules_cache_enabled
+    _rules_cache_enabled = True
+    db_manager.enable_connection_pool()
+    _stop.clear()
+    thread = threading.Thread(target=monitor_alerts, name='alert-monitor', daemon=True)
+    thread.start()
+    return thread
+
+def get_check_interval(rule):
+    """Return how often (in seconds) a rule should be checked"""
+    return rule.get('check_interval_seconds') or CHECK_INTERVAL
+
+def check_rule(rule, recent_readings, states):
+    """Advance one rule's ok -> firing -> resolved lifecycle against a ReadingBatch of recent readings
+
+    Runs the batch through RuleLifecycle, the same transitions replay_alerts
+    uses, and sends one notification per transition: a rule fires once per
+    incident and sends one recovery notification when it is back past the
+    hysteresis margin. `states` maps rule_id -> state and is updated in place.
+
+    Returns when the rule leaves cooldown, or None if it should be checked on its normal interval.
+    """
+    metric_column = get_metric_column(rule['metric'])
+    if not metric_column:
+        return None
+    
+    state = states.get(rule['id'], {})
+    cooldown_until = state.get('cooldown_until')
+    if cooldown_until is None:
+        # Bancos anteriores à coluna cooldown_until: o cooldown conta a partir do último envio
+        cooldown_end = get_cooldown_end(db_manager.get_last_alert_time(rule['id']), rule['cooldown_minutes'])
+        cooldown_until = cooldown_end.strftime(TIMESTAMP_FORMAT) if cooldown_end else ''
+    lifecycle = RuleLifecycle(rule, state.get('state') == 'firing', state.get('since'), cooldown_until)
+    
+    # Check cooldown
+    if not lifecycle.firing and datetime.now(db_manager.BR_TZ).strftime(TIMESTAMP_FORMAT) < lifecycle.cooldown_until:
+        print(f"Rule {rule['id']} in cooldown. Skipping...")
+        return datetime.strptime(lifecycle.cooldown_until, TIMESTAMP_FORMAT).replace(tzinfo=db_manager.BR_TZ)
+    
+    # O lote vem do mais novo para o mais antigo; o ciclo de vida avança em ordem cronológica
+    events = lifecycle.advance(recent_readings.timestamps[::-1], recent_readings.columns[metric_column][::-1])
+    for event, timestamp, sensor_value in events:
+        notify_alert(rule, sensor_value, timestamp, event=event)
+        if event == 'triggered':
+            print(f"Alert sent for rule {rule['id']}: {rule['metric']} = {sensor_value}")
+        else:
+            print(f"Rule {rule['id']} resolved: {rule['metric']} = {sensor_value}")
+    if events:
+        states[rule['id']] = db_manager.set_alert_state(
+            rule['id'], 'firing' if lifecycle.firing else 'ok', events[-1][2], lifecycle.since, lifecycle.cooldown_until
+        )
+    return None
+
+def notify_alert(rule, sensor_value, timestamp, event='triggered'):
+    """Send the email for a lifecycle transition and record it in alert_history"""
+    condition_text = format_condition_text(
+        rule['condition'], 
+        rule['threshold_value'],
+        rule['threshold_max']
+    )
+    
+    if event == 'resolved':
+        subject = f"Resolved: {rule['sensor_type']} {rule['metric']} back to normal"
+        message = f"""
+Alert Resolved!
+
+Sensor Type: {rule['sensor_type']}
+Metric: {rule['metric']}
+Current Value: {sensor_value}
+Condition: {condition_text}
+Timestamp: {timestamp}
+
+The metric no longer meets the alert condition.
+        """
+    else:
+        subject = f"Alert: {rule['sensor_type']} {rule['metric']} threshold exceeded"
+        message = f"""
+Alert Triggered!
+
+Sensor Type: {rule['sensor_type']}
+Metric: {rule['metric']}
+Current Value: {sensor_value}
+Condition: {condition_text}
+Timestamp: {timestamp}
+
+You will be notified once when the metric recovers; no repeated alerts are sent while it stays out of range.
+        """
+    
+    # Send email
+    email_sent = send_email_via_emailjs(
+        rule['recipient_email'],
+        subject,
+        message
+    )
+    
+    # Record in history
+    db_manager.create_alert_history(
+        rule_id=rule['id'],
+        sensor_value=sensor_value,
+        message=message,
+        email_status='sent' if email_sent else 'failed',
+        event=event
+    )
+    return email_sent
+
 def monitor_alerts():
-    """Main monitoring loop"""
+    """Main monitoring loop
+
+    Rules are kept in a heap ordered by their next due time: each rule is checked
+    on its own interval, rules in cooldown are not woken until the cooldown ends,
+    and the loop sleeps until the next rule is due (or until the rules change).
+    """
     print("Alert Monitor started...")
     
-    # Initialize database
-    db_manager.init_alert_tables()
+    states = None
+    schedule = []  # heap de (próxima verificação, intervalo, rule_id)
+    scheduled = set()
+    checked_at = {}  # rule_id -> instante (monotônico) da última leitura avaliada
+    rules = {}
+    next_refresh = 0.0
     
-    while True:
+    while not _stop.is_set():
         try:
-            # Get active alert rules
-            active_rules = db_manager.get_active_alert_rules()
+            # Initialize database (dentro do laço: um lock na partida, por exemplo com a API
+            # criando o índice ao mesmo tempo, só adia o monitor em vez de matar a thread)
+            if states is None:
+                db_manager.init_alert_tables()
+                states = db_manager.get_alert_states()
             
-            if not active_rules:
-                print("No active rules. Waiting...")
-                time.sleep(CHECK_INTERVAL)
-                continue
+            now = time.monotonic()
             
-            # Get recent readings (using configured window)
-            recent_readings = db_manager.get_recent_readings(minutes=READING_WINDOW_MINUTES)
-            
-            if not recent_readings:
-                print("No recent readings. Waiting...")
-                time.sleep(CHECK_INTERVAL)
-                continue
+            # Get active alert rules (new rules are due immediately)
+            if now >= next_refresh:
+                rules = {rule['id']: rule for rule in get_active_rules()}
+                for rule_id in [rule_id for rule_id in checked_at if rule_id not in rules]:
+                    del checked_at[rule_id]
+                for rule_id, rule in rules.items():
+                    if rule_id not in scheduled:
+                        heapq.heappush(schedule, (now, get_check_interval(rule), rule_id))
+                        scheduled.add(rule_id)
+                next_refresh = now + CHECK_INTERVAL
+                if not rules:
+                    print("No active rules. Waiting...")
             
-            print(f"Checking {len(active_rules)} rules against {len(recent_readings)} readings...")
+            # Pop every rule that is due (deactivated or deleted rules are dropped here)
+            due_rules = []
+            while schedule and schedule[0][0] <= now:
+                _, _, rule_id = heapq.heappop(schedule)
+                if rule_id in rules:
+                    due_rules.append(rules[rule_id])
+                else:
+                    scheduled.discard(rule_id)
             
-            # Check each rule against recent readings
-            for rule in active_rules:
-                # Map sensor type to database column
-                metric_map = {
-                    'cpu': 'cpu',
-                    'ram': 'ram',
-                    'temperatura': 'temperatura',
-                    'temperature': 'temperatura',
-                    'potencia': 'potencia',
-                    'power': 'potencia'
-                }
+            if due_rules:
+                # Get recent readings: the configured window plus the time since the oldest
+                # due rule was last checked, so long intervals leave no unread readings
+                gap = max((now - checked_at[rule['id']] for rule in due_rules if rule['id'] in checked_at), default=0)
+                # Only the columns the due rules evaluate are read
+                metrics = sorted({get_metric_column(rule['metric']) for rule in due_rules} - {None})
+                recent_readings = None
+                try:
+                    recent_readings = db_manager.get_recent_reading_batch(
+                        minutes=READING_WINDOW_MINUTES + gap / 60, metrics=metrics
+                    )
+                except Exception as e:
+                    # Ex.: database is locked; as regras continuam agendadas e são verificadas de novo
+                    print(f"Error in monitoring loop: {str(e)}")
+                else:
+                    if recent_readings:
+                        print(f"Checking {len(due_rules)} due rules against {len(recent_readings)} readings...")
+                    else:
+                        print("No recent readings. Waiting...")
                 
-                metric_column = metric_map.get(rule['metric'].lower())
-                if not metric_column:
-                    continue
-                
-                # Check cooldown
-                last_alert_time = db_manager.get_last_alert_time(rule['id'])
-                if last_alert_time:
-                    cooldown_end = last_alert_time + timedelta(minutes=rule['cooldown_minutes'])
-                    if datetime.now() < cooldown_end:
-                        print(f"Rule {rule['id']} in cooldown. Skipping...")
-                        continue
-                
-                # Check each reading
-                for reading in recent_readings:
-                    sensor_value = reading.get(metric_column)
-                    if sensor_value is None:
-                        continue
-                    
-                    # Check if condition is met
-                    if check_condition(
-                        sensor_value, 
-                        rule['condition'], 
-                        rule['threshold_value'],
-                        rule['threshold_max']
-                    ):
-                        # Condition violated! Send alert
-                        condition_text = format_condition_text(
-                            rule['condition'], 
-                            rule['threshold_value'],
-                            rule['threshold_max']
-                        )
-                        
-                        subject = f"Alert: {rule['sensor_type']} {rule['metric']} threshold exceeded"
-                        message = f"""
-Alert Triggered!
-
-Sensor Type: {rule['sensor_type']}
-Metric: {rule['metric']}
-Current Value: {sensor_value}
-Condition: {condition_text}
-Timestamp: {reading['timestamp']}
-
-This alert will not be sent again for {rule['cooldown_minutes']} minutes.
-                        """
-                        
-                        # Send email
-                        email_sent = send_email_via_emailjs(
-                            rule['recipient_email'],
-                            subject,
-                            message
-                        )
-                        
-                        # Record in history
-                        db_manager.create_alert_history(
-                            rule_id=rule['id'],
-                            sensor_value=sensor_value,
-                            message=message,
-                            email_status='sent' if email_sent else 'failed'
-                        )
-                        
-                        print(f"Alert sent for rule {rule['id']}: {rule['metric']} = {sensor_value}")
-                        
-                        # Only send one alert per rule per check cycle
-                        break
+                for rule in due_rules:
+                    interval = get_check_interval(rule)
+                    delay = interval
+                    cooldown_end = None
+                    try:
+                        if recent_readings:
+                            cooldown_end = check_rule(rule, recent_readings, states)
+                        if recent_readings is not None:
+                            checked_at[rule['id']] = now
+                    except Exception as e:
+                        print(f"Error checking rule {rule['id']}: {str(e)}")
+                    if cooldown_end:
+                        delay = max(delay, (cooldown_end - datetime.now(db_manager.BR_TZ)).total_seconds())
+                    heapq.heappush(schedule, (time.monotonic() + delay, interval, rule['id']))
             
-            # Wait before next check
-            print(f"Check complete. Waiting {CHECK_INTERVAL} seconds...")
-            time.sleep(CHECK_INTERVAL)
+            # Wait until the next rule is due; rule changes reschedule everything
+            wake_at = min(schedule[0][0], next_refresh) if schedule else next_refresh
+            if wait_next_check(wake_at - time.monotonic()):
+                schedule.clear()
+                scheduled.clear()
+                next_refresh = 0.0
             
         except Exception as e:
             print(f"Error in monitoring loop: {str(e)}")
-            time.sleep(CHECK_INTERVAL)
+            # Nenhuma regra retirada da fila pode se perder: tudo é reagendado na próxima volta
+            schedule.clear()
+            scheduled.clear()
+            next_refresh = 0.0
+            wait_next_check()
+
+def parse_replay_range(start, end, max_days=None):
+    """Validate a replay range ('YYYY-MM-DD HH:MM:SS' strings, at most `max_days` long), raising ValueError; returns (start, end)"""
+    try:
+        start_dt = datetime.strptime(str(start), TIMESTAMP_FORMAT)
+        end_dt = datetime.strptime(str(end), TIMESTAMP_FORMAT)
+    except ValueError:
+        raise ValueError("start and end must be timestamps in the format 'YYYY-MM-DD HH:MM:SS'")
+    if start_dt > end_dt:
+        raise ValueError('start must not be after end')
+    if max_days is not None and end_dt - start_dt > timedelta(days=max_days):
+        raise ValueError(f'replay range must not exceed {max_days} days')
+    return start_dt.strftime(TIMESTAMP_FORMAT), end_dt.strftime(TIMESTAMP_FORMAT)
+
+def replay_alerts(start, end, rules=None, chunk_size=5000, max_alerts_per_rule=100):
+    """Backtest a rule set against historical readings without sending emails
+
+    Readings between start and end ('YYYY-MM-DD HH:MM:SS', BR_TZ) are streamed
+    in chunks through RuleLifecycle, the same transitions monitor_alerts uses,
+    with the reading timestamps as simulated time. Defaults to the active rules
+    in the database.
+    """
+    if rules is None:
+        rules = db_manager.get_active_alert_rules()
+    
+    report = []
+    lifecycles = []  # (coluna, ciclo de vida, entrada do relatório)
+    for rule in rules:
+        entry = {
+            'rule_id': rule.get('id'),
+            'sensor_type': rule['sensor_type'],
+            'metric': rule['metric'],
+            'condition': format_condition_text(rule['condition'], rule['threshold_value'], rule.get('threshold_max')),
+            'violations': 0,
+            'alerts_count': 0,
+            'resolved_count': 0,
+            'peak_value': None,
+            'alerts': []
+        }
+        report.append(entry)
+        metric_column = get_metric_column(rule['metric'])
+        if not metric_column:
+            entry['error'] = f"unknown metric '{rule['metric']}'"
+            continue
+        lifecycles.append((metric_column, RuleLifecycle(rule), entry))
+    
+    # Só as colunas usadas pelas regras são lidas do banco
+    metrics = sorted({metric_column for metric_column, _, _ in lifecycles}) or ['cpu']
+    readings = 0
+    first_timestamp = last_timestamp = None
+    for batch in db_manager.iter_reading_batches(start, end, chunk_size=chunk_size, metrics=metrics):
+        readings += len(batch)
+        if first_timestamp is None:
+            first_timestamp = batch.timestamps[0]
+        last_timestamp = batch.timestamps[-1]
+        for metric_column, lifecycle, entry in lifecycles:
+            for event, timestamp, value in lifecycle.advance(batch.timestamps, batch.columns[metric_column]):
+                if event == 'resolved':
+                    entry['resolved_count'] += 1
+                    continue
+                entry['alerts_count'] += 1
+                if len(entry['alerts']) < max_alerts_per_rule:
+                    entry['alerts'].append({'timestamp': timestamp, 'sensor_value': value})
+    
+    for metric_column, lifecycle, entry in lifecycles:
+        entry['violations'] = lifecycle.violations
+        entry['peak_value'] = lifecycle.peak
+    
+    return {
+        'start': start,
+        'end': end,
+        'readings': readings,
+        'first_reading': first_timestamp,
+        'last_reading': last_timestamp,
+        'rules': report
+    }
 
-if __name__ == '__main__':
-    monitor_alerts()
\ No newline at end of file
+def print_replay_report(report):
+    """Print a replay report in a readable format"""
+    print(f"Replay {report['start']} -> {report['end']}: {report['readings']} readings")
+    for entry in report['rules']:
+        label = f"Rule {entry['rule_id']}" if entry['rule_id'] is not None else "Rule"
+        if 'error' in entry:
+            print(f"{label}: {entry['error']}")
+            continue
+        print(f"{label} ({entry['metric']} {entry['condition']}): "
+              f"{entry['alerts_count']} alerts, {entry['resolved_count']} resolved, "
+              f"{entry['violations']} violating readings, peak {entry['peak_value']}")
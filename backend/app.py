@@ -1,6 +1,10 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, send_from_directory
 from flask_cors import CORS
-from . import db_manager
+from . import db_manager, alert_monitor
+from .responses import compress_response, json_response, raw_data_response
+import csv
+import io
+import math
 import os
 
 # Define o caminho para a pasta dist (frontend build)
@@ -9,55 +13,175 @@ DIST_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'dist')
 app = Flask(__name__, static_folder=DIST_FOLDER, static_url_path='')
 CORS(app)
 
-# Initialize database tables
-db_manager.init_alert_tables()
+# Tabelas são criadas na primeira requisição, não na importação do módulo
+_alert_tables_ready = False
+
+@app.before_request
+def ensure_alert_tables():
+    """Initialize database tables once, before the first request"""
+    global _alert_tables_ready
+    if not _alert_tables_ready:
+        db_manager.init_alert_tables()
+        _alert_tables_ready = True
+
+@app.after_request
+def compress(response):
+    """Gzip large JSON/CSV responses for clients that accept it"""
+    return compress_response(response)
+
+VALID_CONDITIONS = ('greater_than', 'less_than', 'between', 'outside')
+
+# Janela máxima (em horas) aceita pelo preview de regras: o custo cresce com o número de
+# leituras na janela (48h a 1 leitura/s, ~170 mil linhas, levam ~30 ms) mais uma busca por
+# disparo/resolução, limitada a 1000 alertas (cpu > 50 com cooldown 0 tem ~43 mil incidentes
+# em 48h e levaria ~220 ms sem o limite; com ele fica abaixo de 50 ms)
+PREVIEW_MAX_HOURS = 48
+
+# Intervalo máximo (em dias) aceito pelo replay da API: 7 dias a 1 leitura/s com uma dúzia
+# de regras levam ~2,5s; intervalos maiores ficam para o CLI (monitor --replay)
+REPLAY_MAX_DAYS = 7
+
+# Colunas usadas na importação/exportação de regras (JSON e CSV)
+RULE_EXPORT_FIELDS = (
+    'sensor_type', 'metric', 'condition', 'threshold_value', 'threshold_max',
+    'recipient_email', 'cooldown_minutes', 'is_active', 'check_interval_seconds', 'hysteresis'
+)
+
+def parse_float(value, field):
+    """Parse a finite float (rejects 'nan' and 'inf', which SQLite would store as NULL)"""
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"'{field}' must be a finite number")
+    return value
+
+def parse_is_active(value):
+    """Parse a rule's active flag, which must be 0 or 1 (the monitor only runs rules with is_active = 1)"""
+    value = int(value)
+    if value not in (0, 1):
+        raise ValueError('is_active must be 0 or 1')
+    return value
+
+def parse_check_interval(data):
+    """Parse the optional per-rule check interval (seconds); None uses CHECK_INTERVAL"""
+    value = data.get('check_interval_seconds')
+    if value in (None, ''):
+        return None
+    value = int(value)
+    if value < 1:
+        raise ValueError('check_interval_seconds must be at least 1')
+    return value
+
+def parse_hysteresis(data):
+    """Parse the optional recovery margin of a rule (same unit as the metric, >= 0)"""
+    value = data.get('hysteresis')
+    if value in (None, ''):
+        return 0.0
+    value = parse_float(value, 'hysteresis')
+    if value < 0:
+        raise ValueError('hysteresis must not be negative')
+    return value
+
+def check_recovery_band(condition, threshold_value, threshold_max, hysteresis):
+    """Reject an 'outside' rule whose hysteresis leaves no value it could recover to"""
+    # A recuperação de 'outside' exige threshold_value + h <= valor <= threshold_max - h
+    if condition == 'outside' and 2 * hysteresis >= threshold_max - threshold_value:
+        raise ValueError("hysteresis must be less than half of threshold_max - threshold_value "
+                         "for condition 'outside', or the rule never recovers")
+
+def parse_rule_payload(data):
+    """Validate and normalize an alert rule payload, raising ValueError on bad input"""
+    if not isinstance(data, dict):
+        raise ValueError('rule must be an object')
+    for field in ('sensor_type', 'metric', 'condition', 'threshold_value', 'recipient_email'):
+        if data.get(field) in (None, ''):
+            raise ValueError(f"missing field '{field}'")
+    if not alert_monitor.get_metric_column(data['metric']):
+        raise ValueError(f"invalid metric '{data['metric']}'")
+    condition = data['condition']
+    if condition not in VALID_CONDITIONS:
+        raise ValueError(f"invalid condition '{condition}'")
+    threshold_value = parse_float(data['threshold_value'], 'threshold_value')
+    threshold_max = parse_float(data['threshold_max'], 'threshold_max') if data.get('threshold_max') not in (None, '') else None
+    if condition in ('between', 'outside') and threshold_max is None:
+        raise ValueError(f"condition '{condition}' requires threshold_max")
+    cooldown = int(data['cooldown_minutes']) if data.get('cooldown_minutes') not in (None, '') else 30
+    if cooldown < 0:
+        raise ValueError('cooldown_minutes must not be negative')
+    is_active = parse_is_active(data['is_active']) if data.get('is_active') not in (None, '') else 1
+    check_interval = parse_check_interval(data)
+    hysteresis = parse_hysteresis(data)
+    check_recovery_band(condition, threshold_value, threshold_max, hysteresis)
+    return {
+        'sensor_type': str(data['sensor_type']),
+        'metric': str(data['metric']),
+        'condition': condition,
+        'threshold_value': threshold_value,
+        'threshold_max': threshold_max,
+        'recipient_email': str(data['recipient_email']),
+        'cooldown_minutes': cooldown,
+        'is_active': is_active,
+        'check_interval_seconds': check_interval,
+        'hysteresis': hysteresis,
+    }
+
+def parse_rule_ids(data):
+    """Extract a list of integer rule ids from a bulk request payload"""
+    ids = (data or {}).get('ids')
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("'ids' must be a non-empty list")
+    return [int(rule_id) for rule_id in ids]
+
+def _read_import_rows():
+    """Read rule rows from the request as JSON (list or {'rules': [...]}) or CSV (body or 'file' upload)"""
+    upload = request.files.get('file')
+    if upload is not None:
+        return list(csv.DictReader(io.StringIO(upload.read().decode('utf-8-sig'))))
+    if request.mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('rules')
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON list of rules, {'rules': [...]} or a CSV file")
+    return data
 
 @app.route('/api/alert-rules', methods=['GET'])
 def get_alert_rules():
     """Get all alert rules"""
     try:
-        rules = db_manager.get_all_alert_rules()
-        return jsonify({'success': True, 'data': rules})
+        return raw_data_response(db_manager.get_all_alert_rules_json())
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/alert-rules', methods=['POST'])
 def create_alert_rule():
     """Create a new alert rule"""
     try:
-        data = request.json
-        rule_id = db_manager.create_alert_rule(
-            sensor_type=data['sensor_type'],
-            metric=data['metric'],
-            condition=data['condition'],
-            threshold_value=float(data['threshold_value']),
-            threshold_max=float(data.get('threshold_max')) if data.get('threshold_max') else None,
-            recipient_email=data['recipient_email'],
-            cooldown_minutes=int(data.get('cooldown_minutes', 30))
-        )
-        return jsonify({'success': True, 'rule_id': rule_id})
+        rule = parse_rule_payload(request.get_json(silent=True))
+    except (ValueError, TypeError) as e:
+        return json_response({'success': False, 'error': str(e)}), 400
+    try:
+        # Regras novas sempre começam ativas
+        del rule['is_active']
+        rule_id = db_manager.create_alert_rule(**rule)
+        alert_monitor.invalidate_rules_cache()
+        return json_response({'success': True, 'rule_id': rule_id})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/alert-rules/<int:rule_id>', methods=['PUT'])
 def update_alert_rule(rule_id):
     """Update an existing alert rule"""
     try:
-        data = request.json
-        db_manager.update_alert_rule(
-            rule_id=rule_id,
-            sensor_type=data['sensor_type'],
-            metric=data['metric'],
-            condition=data['condition'],
-            threshold_value=float(data['threshold_value']),
-            threshold_max=float(data.get('threshold_max')) if data.get('threshold_max') else None,
-            recipient_email=data['recipient_email'],
-            cooldown_minutes=int(data.get('cooldown_minutes', 30)),
-            is_active=int(data.get('is_active', 1))
-        )
-        return jsonify({'success': True})
+        rule = parse_rule_payload(request.get_json(silent=True))
+    except (ValueError, TypeError) as e:
+        return json_response({'success': False, 'error': str(e)}), 400
+    try:
+        db_manager.update_alert_rule(rule_id=rule_id, **rule)
+        alert_monitor.invalidate_rules_cache()
+        return json_response({'success': True})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/alert-rules/<int:rule_id>/toggle', methods=['PATCH'])
 def toggle_alert_rule(rule_id):
@@ -65,42 +189,172 @@ def toggle_alert_rule(rule_id):
     try:
         data = request.json
         db_manager.toggle_alert_rule(rule_id, int(data['is_active']))
-        return jsonify({'success': True})
+        alert_monitor.invalidate_rules_cache()
+        return json_response({'success': True})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/alert-rules/<int:rule_id>', methods=['DELETE'])
 def delete_alert_rule(rule_id):
     """Delete an alert rule"""
     try:
         db_manager.delete_alert_rule(rule_id)
-        return jsonify({'success': True})
+        alert_monitor.invalidate_rules_cache()
+        return json_response({'success': True})
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/alert-rules/import', methods=['POST'])
+def import_alert_rules():
+    """Import many alert rules at once (JSON or CSV), all-or-nothing"""
+    try:
+        rows = _read_import_rows()
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}), 400
+
+    # Valida tudo antes de gravar: uma linha inválida rejeita o lote inteiro
+    rules, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            rules.append(parse_rule_payload(row))
+        except (ValueError, TypeError) as e:
+            errors.append({'index': index, 'error': str(e)})
+    if errors:
+        return json_response({'success': False, 'error': 'Validation failed', 'errors': errors}), 400
+    if not rules:
+        return json_response({'success': False, 'error': 'No rules to import'}), 400
+
+    try:
+        imported = db_manager.create_alert_rules_bulk(rules)
+        alert_monitor.invalidate_rules_cache()
+        return json_response({'success': True, 'imported': imported})
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/alert-rules/export', methods=['GET'])
+def export_alert_rules():
+    """Export all alert rules as JSON (default) or CSV (?format=csv)"""
+    try:
+        rules = [{field: rule[field] for field in RULE_EXPORT_FIELDS} for rule in db_manager.get_all_alert_rules()]
+        if request.args.get('format', 'json') == 'csv':
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=RULE_EXPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rules)
+            return Response(
+                buffer.getvalue(),
+                mimetype='text/csv',
+                headers={'Content-Disposition': 'attachment; filename=alert_rules.csv'}
+            )
+        return json_response({'success': True, 'data': rules})
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/alert-rules/bulk/toggle', methods=['PATCH'])
+def toggle_alert_rules_bulk():
+    """Toggle the active status of many alert rules in one transaction"""
+    try:
+        data = request.get_json(silent=True)
+        rule_ids = parse_rule_ids(data)
+        is_active = parse_is_active(data['is_active'])
+    except (ValueError, TypeError, KeyError) as e:
+        return json_response({'success': False, 'error': str(e)}), 400
+    try:
+        updated = db_manager.toggle_alert_rules_bulk(rule_ids, is_active)
+        alert_monitor.invalidate_rules_cache()
+        return json_response({'success': True, 'updated': updated})
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/alert-rules/bulk/delete', methods=['POST'])
+def delete_alert_rules_bulk():
+    """Delete many alert rules in one transaction"""
+    try:
+        rule_ids = parse_rule_ids(request.get_json(silent=True))
+    except (ValueError, TypeError) as e:
+        return json_response({'success': False, 'error': str(e)}), 400
+    try:
+        deleted = db_manager.delete_alert_rules_bulk(rule_ids)
+        alert_monitor.invalidate_rules_cache()
+        return json_response({'success': True, 'deleted': deleted})
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/alert-rules/preview', methods=['POST'])
+def preview_alert_rule():
+    """Preview how often a proposed rule would have fired (and recovered) in the last N hours"""
+    try:
+        data = request.get_json(silent=True) or {}
+        metric_column = alert_monitor.get_metric_column(data.get('metric'))
+        if not metric_column:
+            raise ValueError(f"invalid metric '{data.get('metric')}'")
+        condition = data.get('condition')
+        if condition not in VALID_CONDITIONS:
+            raise ValueError(f"invalid condition '{condition}'")
+        threshold_max = parse_float(data['threshold_max'], 'threshold_max') if data.get('threshold_max') not in (None, '') else None
+        if condition in ('between', 'outside') and threshold_max is None:
+            raise ValueError(f"condition '{condition}' requires threshold_max")
+        threshold_value = parse_float(data['threshold_value'], 'threshold_value')
+        cooldown_minutes = 30 if data.get('cooldown_minutes') in (None, '') else max(int(data['cooldown_minutes']), 0)
+        hours = min(max(int(data.get('hours') or 24), 1), PREVIEW_MAX_HOURS)
+        hysteresis = parse_hysteresis(data)
+        check_recovery_band(condition, threshold_value, threshold_max, hysteresis)
+    except (ValueError, TypeError, KeyError) as e:
+        return json_response({'success': False, 'error': str(e)}), 400
+    try:
+        preview = db_manager.preview_alert_rule(
+            metric_column, condition, threshold_value, threshold_max, cooldown_minutes, hours, hysteresis
+        )
+        return json_response({'success': True, 'data': preview})
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/alert-rules/replay', methods=['POST'])
+def replay_alert_rules():
+    """Backtest rules over a historical range of readings (no emails are sent)
+
+    Body: {'start': 'YYYY-MM-DD HH:MM:SS', 'end': '...', 'rules': [...] (optional,
+    defaults to active rules), 'rule_ids': [...] (optional)}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        start, end = alert_monitor.parse_replay_range(data.get('start'), data.get('end'), max_days=REPLAY_MAX_DAYS)
+        rules = None
+        if data.get('rules'):
+            rules = [parse_rule_payload(rule) for rule in data['rules']]
+    except (ValueError, TypeError, KeyError) as e:
+        return json_response({'success': False, 'error': str(e)}), 400
+    try:
+        if rules is None and data.get('rule_ids'):
+            wanted = {int(rule_id) for rule_id in data['rule_ids']}
+            rules = [rule for rule in db_manager.get_all_alert_rules() if rule['id'] in wanted]
+        report = alert_monitor.replay_alerts(start, end, rules=rules)
+        return json_response({'success': True, 'data': report})
+    except Exception as e:
+        return json_response({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/alert-history', methods=['GET'])
 def get_alert_history():
     """Get alert history"""
     try:
         limit = request.args.get('limit', 100, type=int)
-        history = db_manager.get_alert_history(limit)
-        return jsonify({'success': True, 'data': history})
+        return raw_data_response(db_manager.get_alert_history_json(limit))
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/alert-statistics', methods=['GET'])
 def get_alert_statistics():
     """Get alert statistics"""
     try:
         stats = db_manager.get_alert_statistics()
-        return jsonify({'success': True, 'data': stats})
+        return json_response({'success': True, 'data': stats})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/emailjs-config', methods=['GET'])
 def get_emailjs_config():
     """Get EmailJS configuration (stored in environment variables)"""
-    return jsonify({
+    return json_response({
         'success': True,
         'data': {
             'service_id': os.environ.get('EMAILJS_SERVICE_ID', ''),
@@ -116,9 +370,9 @@ def save_emailjs_config():
         data = request.json
         # In a production environment, you would save this to a secure configuration file
         # For now, we'll just return success
-        return jsonify({'success': True, 'message': 'Configuration saved. Please set environment variables: EMAILJS_SERVICE_ID, EMAILJS_TEMPLATE_ID, EMAILJS_PUBLIC_KEY'})
+        return json_response({'success': True, 'message': 'Configuration saved. Please set environment variables: EMAILJS_SERVICE_ID, EMAILJS_TEMPLATE_ID, EMAILJS_PUBLIC_KEY'})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return json_response({'success': False, 'error': str(e)}), 500
 
 # Rotas para servir o frontend (React build)
 @app.route('/')
@@ -134,6 +388,3 @@ def serve_static_files(path):
         return send_from_directory(app.static_folder, path)
     # Caso contrário, serve o index.html (para suportar rotas do React Router)
     return send_from_directory(app.static_folder, 'index.html')
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5555, debug=True)
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Benchmarks do AlertSystem
+"""
+import gzip
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Orçamento de cold start (em ms) para importar cada módulo em um processo novo
+COLD_START_BUDGET_MS = {
+    'backend': 5,
+    'backend.config': 10,
+    'backend.db_manager': 25,
+    'backend.alert_monitor': 30,
+    'backend.app': 400,
+}
+
+def measure_import_ms(module, runs=5):
+    """Median time (ms) to import a module in a fresh interpreter, excluding interpreter startup"""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def bench_cold_start(runs=5):
+    """Measure import time of each backend module against its cold start budget"""
+    results = []
+    for module, budget in COLD_START_BUDGET_MS.items():
+        elapsed = measure_import_ms(module, runs)
+        results.append({
+            'module': module,
+            'import_ms': round(elapsed, 1),
+            'budget_ms': budget,
+            'ok': elapsed <= budget
+        })
+    return results
+
+def _best_ms(func, runs):
+    """Best wall time (ms) of `runs` calls"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_serialization(rows=5000, runs=5):
+    """Compare /api/alert-history serialization: dict(row) + json (old jsonify path) vs the response layer
+
+    Uses a temporary database, so it never touches the configured one.
+    """
+    from . import config, db_manager
+    from .responses import GZIP_LEVEL
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config.configure(os.path.join(tmp, 'bench.db'))
+        db_manager.init_alert_tables()
+        db_manager.create_alert_rule('Sistema', 'temperatura', 'greater_than', 70.0, None, 'ops@example.com', 30)
+        rule_id = db_manager.get_all_alert_rules()[0]['id']
+        message = "\nAlert Triggered!\n\nSensor Type: Sistema\nMetric: temperatura\nCurrent Value: 75.3\n"
+        with db_manager._connection() as conn:
+            conn.executemany(
+                "INSERT INTO alert_history (rule_id, sensor_value, message, sent_at) VALUES (?, ?, ?, ?)",
+                [(rule_id, 70 + i % 100 / 7, message, f"2026-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}") for i in range(rows)]
+            )
+        
+        def old_path():
+            # Mesma saída do jsonify do Flask 3 fora do modo debug (compacto, chaves ordenadas)
+            payload = {'success': True, 'data': db_manager.get_alert_history(rows)}
+            return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        
+        def new_path():
+            return b'{"success":true,"data":' + db_manager.get_alert_history_json(rows).encode('utf-8') + b'}'
+        
+        old_body, new_body = old_path(), new_path()
+        return {
+            'rows': rows,
+            'old_ms': round(_best_ms(old_path, runs), 1),
+            'new_ms': round(_best_ms(new_path, runs), 1),
+            'old_bytes': len(old_body),
+            'new_bytes': len(new_body),
+            'gzip_bytes': len(gzip.compress(new_body, compresslevel=GZIP_LEVEL)),
+            'gzip_ms': round(_best_ms(lambda: gzip.compress(new_body, compresslevel=GZIP_LEVEL), runs), 1),
+        }
+
+def run_benchmarks(runs=5):
+    """Run all benchmarks, print a report and return True if every budget is met"""
+    print("=" * 60)
+    print("ALERTSYSTEM - BENCHMARK")
+    print("=" * 60)
+    
+    ok = True
+    print("Cold start (import em processo novo, mediana):")
+    for result in bench_cold_start(runs):
+        status = "OK" if result['ok'] else "ACIMA DO ORÇAMENTO"
+        print(f"  {result['module']:<24} {result['import_ms']:>8.1f} ms  (orçamento {result['budget_ms']} ms)  {status}")
+        ok = ok and result['ok']
+    
+    result = bench_serialization(runs=runs)
+    print(f"Serialização de /api/alert-history ({result['rows']} linhas):")
+    print(f"  dict(row) + json (antigo) {result['old_ms']:>8.1f} ms  {result['old_bytes']:>9} bytes")
+    print(f"  JSON pelo SQLite (novo)   {result['new_ms']:>8.1f} ms  {result['new_bytes']:>9} bytes")
+    print(f"  gzip nível da API         {result['gzip_ms']:>8.1f} ms  {result['gzip_bytes']:>9} bytes")
+    
+    print("=" * 60)
+    return ok
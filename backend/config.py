@@ -24,16 +24,39 @@ ENV_DB_PATH = os.environ.get('SISTEMA_DB_PATH')
 # ESCOLHA QUAL BANCO DE DADOS USAR
 # ========================================
 
-# Prioridade: Variável de ambiente > Real Time > Local
-if ENV_DB_PATH and os.path.exists(ENV_DB_PATH):
-    DB_PATH = ENV_DB_PATH
-    DB_SOURCE = "environment variable"
-elif os.path.exists(REAL_DB_PATH):
-    DB_PATH = REAL_DB_PATH
-    DB_SOURCE = "Sistema (real-time)"
-else:
-    DB_PATH = LOCAL_DB_PATH
-    DB_SOURCE = "local copy (WARNING: may be outdated)"
+# Resolvido uma única vez, sob demanda (ou explicitamente via configure()),
+# para que importar o pacote não toque no sistema de arquivos
+_db_config = None
+
+def resolve_db_path():
+    """Resolve the database path and its source (env variable > real-time > local)"""
+    if ENV_DB_PATH and os.path.exists(ENV_DB_PATH):
+        return ENV_DB_PATH, "environment variable"
+    elif os.path.exists(REAL_DB_PATH):
+        return REAL_DB_PATH, "Sistema (real-time)"
+    return LOCAL_DB_PATH, "local copy (WARNING: may be outdated)"
+
+def configure(db_path=None):
+    """Resolve the configuration once; an explicit db_path skips path discovery"""
+    global _db_config
+    _db_config = (db_path, "command line") if db_path else resolve_db_path()
+    return _db_config
+
+def get_db_path():
+    """Return the configured database path, resolving it on first use"""
+    return (_db_config or configure())[0]
+
+def get_db_source():
+    """Return where the configured database path came from"""
+    return (_db_config or configure())[1]
+
+def __getattr__(name):
+    # Compatibilidade: DB_PATH e DB_SOURCE continuam acessíveis como atributos do módulo
+    if name == 'DB_PATH':
+        return get_db_path()
+    if name == 'DB_SOURCE':
+        return get_db_source()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ========================================
 # CONFIGURAÇÕES DE EMAIL
@@ -43,7 +66,10 @@ EMAILJS_SERVICE_ID = os.environ.get('EMAILJS_SERVICE_ID', 'seu_service_id_aqui')
 EMAILJS_TEMPLATE_ID = os.environ.get('EMAILJS_TEMPLATE_ID', 'seu_template_id_aqui')
 EMAILJS_PUBLIC_KEY = os.environ.get('EMAILJS_PUBLIC_KEY', 'seu_public_key_aqui')
 EMAILJS_PRIVATE_KEY = os.environ.get('EMAILJS_PRIVATE_KEY', 'seu_private_key_aqui')
-EMAILJS_API_URL = 'https://api.emailjs.com/api/v1.0/email/send'
+EMAILJS_API_URL = os.environ.get('EMAILJS_API_URL', 'https://api.emailjs.com/api/v1.0/email/send')
+
+# Tempo máximo (em segundos) de espera pela API do EmailJS
+EMAILJS_TIMEOUT = 10
 
 # ========================================
 # CONFIGURAÇÕES DE MONITORAMENTO
@@ -64,9 +90,9 @@ def print_config():
     print("=" * 60)
     print("ALERTSYSTEM - CONFIGURAÇÃO")
     print("=" * 60)
-    print(f"Banco de dados: {DB_PATH}")
-    print(f"Fonte: {DB_SOURCE}")
-    print(f"Arquivo existe? {os.path.exists(DB_PATH)}")
+    print(f"Banco de dados: {get_db_path()}")
+    print(f"Fonte: {get_db_source()}")
+    print(f"Arquivo existe? {os.path.exists(get_db_path())}")
     print(f"Intervalo de verificação: {CHECK_INTERVAL}s")
     print(f"Janela de leituras: {READING_WINDOW_MINUTES} minuto(s)")
     print("=" * 60)
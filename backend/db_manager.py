@@ -1,10 +1,12 @@
 import sqlite3
 import os
+import queue
+from array import array
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-from .config import DB_PATH, DB_SOURCE, print_config
+from .config import get_db_path
 
-# Mostrar configuração ao inicializar o módulo
-print_config()
+NAN = float('nan')
 
 # Fuso horário do Brasil (UTC-3)
 BR_TZ = timezone(timedelta(hours=-3))
@@ -13,9 +15,52 @@ def _now_br_str():
     """Retorna timestamp no fuso BR (UTC-3) no formato 'YYYY-MM-DD HH:MM:SS'."""
     return datetime.now(BR_TZ).strftime("%Y-%m-%d %H:%M:%S")
 
+# Pool de conexões compartilhado (modo processo único); None = uma conexão por chamada
+_pool = None
+
+def enable_connection_pool(size=8):
+    """Reuse up to `size` SQLite connections across threads instead of opening one per call"""
+    global _pool
+    if _pool is None:
+        _pool = queue.LifoQueue(maxsize=size)
+
+@contextmanager
+def _connection():
+    """Yield a SQLite connection inside a transaction (commit on success, rollback on error)"""
+    if _pool is None:
+        conn = sqlite3.connect(get_db_path())
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+        return
+    
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = sqlite3.connect(get_db_path(), check_same_thread=False)
+    conn.row_factory = None
+    try:
+        with conn:
+            yield conn
+    finally:
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+def _add_missing_columns(c, table, columns):
+    """Add columns (name -> SQL type/default) missing from an existing table"""
+    c.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in c.fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
 def init_alert_tables():
-    """Initialize alert_rules and alert_history tables"""
-    with sqlite3.connect(DB_PATH) as conn:
+    """Initialize alert_rules, alert_history and alert_state tables"""
+    with _connection() as conn:
         c = conn.cursor()
         
         # Create alert_rules table
@@ -30,10 +75,18 @@ def init_alert_tables():
                 recipient_email TEXT NOT NULL,
                 cooldown_minutes INTEGER DEFAULT 30,
                 is_active INTEGER DEFAULT 1,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                check_interval_seconds INTEGER,
+                hysteresis REAL DEFAULT 0
             )
         """)
         
+        # Migração: bancos criados antes do intervalo por regra e da histerese
+        _add_missing_columns(c, 'alert_rules', {
+            'check_interval_seconds': 'INTEGER',
+            'hysteresis': 'REAL DEFAULT 0',
+        })
+        
         # Create alert_history table
         c.execute("""
             CREATE TABLE IF NOT EXISTS alert_history (
@@ -43,27 +96,78 @@ def init_alert_tables():
                 message TEXT NOT NULL,
                 sent_at TEXT DEFAULT CURRENT_TIMESTAMP,
                 email_status TEXT DEFAULT 'sent',
+                event TEXT DEFAULT 'triggered',
                 FOREIGN KEY (rule_id) REFERENCES alert_rules(id)
             )
         """)
         
+        # Migração: bancos criados antes do ciclo disparado/resolvido
+        _add_missing_columns(c, 'alert_history', {'event': "TEXT DEFAULT 'triggered'"})
+        
+        # Create alert_state table (estado atual de cada regra: 'ok' ou 'firing')
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS alert_state (
+                rule_id INTEGER PRIMARY KEY,
+                state TEXT NOT NULL,
+                since TEXT NOT NULL,
+                sensor_value REAL
+            ) WITHOUT ROWID
+        """)
+        
+        # Migração: fim do cooldown contado a partir da leitura que disparou (como no replay)
+        _add_missing_columns(c, 'alert_state', {'cooldown_until': 'TEXT'})
+        
+        # Índice de cobertura em sistema_info para consultas por intervalo (monitor, replay e
+        # preview): inclui as métricas para que as agregações não precisem ler a tabela.
+        # A tabela pertence ao SmartLume, então só criamos o índice se ela já existir.
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sistema_info'")
+        if c.fetchone():
+            c.execute("""
+                CREATE INDEX IF NOT EXISTS idx_sistema_info_timestamp_metrics 
+                ON sistema_info(timestamp, cpu, ram, temperatura, potencia)
+            """)
+        
         conn.commit()
 
-def create_alert_rule(sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes):
+def create_alert_rule(sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, check_interval_seconds=None, hysteresis=0):
     """Create a new alert rule (armazena created_at em BR_TZ)"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         c = conn.cursor()
         c.execute("""
             INSERT INTO alert_rules 
-            (sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, _now_br_str()))
+            (sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, check_interval_seconds, hysteresis, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, check_interval_seconds, hysteresis, _now_br_str()))
         conn.commit()
         return c.lastrowid
 
+def _query_json(c, query, params=()):
+    """Run a query and return its rows as a JSON array of objects, encoded by SQLite itself
+
+    The rows never become Python objects; without the JSON1 functions it falls
+    back to encoding the tuples in Python. SQLite writes REAL values with 15
+    significant digits.
+    """
+    c.execute(f"SELECT * FROM ({query}) LIMIT 0", params)
+    columns = [column[0] for column in c.description]
+    pairs = ', '.join(f"'{column}', \"{column}\"" for column in columns)
+    try:
+        c.execute(f"SELECT json_group_array(json_object({pairs})) FROM ({query})", params)
+        return c.fetchone()[0]
+    except sqlite3.OperationalError:
+        import json
+        
+        c.execute(query, params)
+        return json.dumps([dict(zip(columns, row)) for row in c.fetchall()], separators=(',', ':'))
+
+def get_all_alert_rules_json():
+    """Get all alert rules as a JSON array (see _query_json)"""
+    with _connection() as conn:
+        return _query_json(conn.cursor(), "SELECT * FROM alert_rules ORDER BY created_at DESC")
+
 def get_all_alert_rules():
     """Get all alert rules"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         conn.row_factory = sqlite3.Row
         c = conn.cursor()
         c.execute("SELECT * FROM alert_rules ORDER BY created_at DESC")
@@ -71,76 +175,127 @@ def get_all_alert_rules():
 
 def get_active_alert_rules():
     """Get only active alert rules"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         conn.row_factory = sqlite3.Row
         c = conn.cursor()
         c.execute("SELECT * FROM alert_rules WHERE is_active = 1")
         return [dict(row) for row in c.fetchall()]
 
-def update_alert_rule(rule_id, sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, is_active):
+def update_alert_rule(rule_id, sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, is_active, check_interval_seconds=None, hysteresis=0):
     """Update an existing alert rule"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         c = conn.cursor()
         c.execute("""
             UPDATE alert_rules 
             SET sensor_type = ?, metric = ?, condition = ?, threshold_value = ?, 
-                threshold_max = ?, recipient_email = ?, cooldown_minutes = ?, is_active = ?
+                threshold_max = ?, recipient_email = ?, cooldown_minutes = ?, is_active = ?,
+                check_interval_seconds = ?, hysteresis = ?
             WHERE id = ?
-        """, (sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, is_active, rule_id))
+        """, (sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, is_active, check_interval_seconds, hysteresis, rule_id))
         conn.commit()
 
 def toggle_alert_rule(rule_id, is_active):
     """Toggle alert rule active status"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         c = conn.cursor()
         c.execute("UPDATE alert_rules SET is_active = ? WHERE id = ?", (is_active, rule_id))
         conn.commit()
 
 def delete_alert_rule(rule_id):
     """Delete an alert rule"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         c = conn.cursor()
         c.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,))
+        c.execute("DELETE FROM alert_state WHERE rule_id = ?", (rule_id,))
+        conn.commit()
+
+def create_alert_rules_bulk(rules):
+    """Create many alert rules in a single transaction (created_at em BR_TZ)
+
+    `rules` is a list of dicts already validated by the caller. Returns the
+    number of inserted rows.
+    """
+    now = _now_br_str()
+    params = [
+        (r['sensor_type'], r['metric'], r['condition'], r['threshold_value'], r['threshold_max'],
+         r['recipient_email'], r['cooldown_minutes'], r.get('is_active', 1), r.get('check_interval_seconds'),
+         r.get('hysteresis') or 0, now)
+        for r in rules
+    ]
+    with _connection() as conn:
+        c = conn.cursor()
+        c.executemany("""
+            INSERT INTO alert_rules 
+            (sensor_type, metric, condition, threshold_value, threshold_max, recipient_email, cooldown_minutes, is_active, check_interval_seconds, hysteresis, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, params)
         conn.commit()
+        return len(params)
 
-def create_alert_history(rule_id, sensor_value, message, email_status='sent'):
-    """Create a new alert history entry (armazena sent_at em BR_TZ)"""
-    with sqlite3.connect(DB_PATH) as conn:
+def toggle_alert_rules_bulk(rule_ids, is_active):
+    """Set the active status of many alert rules in a single transaction"""
+    with _connection() as conn:
+        c = conn.cursor()
+        c.executemany("UPDATE alert_rules SET is_active = ? WHERE id = ?",
+                      [(is_active, rule_id) for rule_id in rule_ids])
+        conn.commit()
+        return c.rowcount
+
+def delete_alert_rules_bulk(rule_ids):
+    """Delete many alert rules in a single transaction"""
+    with _connection() as conn:
+        c = conn.cursor()
+        c.executemany("DELETE FROM alert_rules WHERE id = ?", [(rule_id,) for rule_id in rule_ids])
+        deleted = c.rowcount
+        c.executemany("DELETE FROM alert_state WHERE rule_id = ?", [(rule_id,) for rule_id in rule_ids])
+        conn.commit()
+        return deleted
+
+def create_alert_history(rule_id, sensor_value, message, email_status='sent', event='triggered'):
+    """Create a new alert history entry (armazena sent_at em BR_TZ); event is 'triggered' or 'resolved'"""
+    with _connection() as conn:
         c = conn.cursor()
         c.execute("""
-            INSERT INTO alert_history (rule_id, sensor_value, message, email_status, sent_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (rule_id, sensor_value, message, email_status, _now_br_str()))
+            INSERT INTO alert_history (rule_id, sensor_value, message, email_status, event, sent_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (rule_id, sensor_value, message, email_status, event, _now_br_str()))
         conn.commit()
         return c.lastrowid
     
+ALERT_HISTORY_QUERY = """
+    SELECT 
+        ah.*,
+        ar.sensor_type,
+        ar.metric,
+        ar.condition,
+        ar.threshold_value,
+        ar.recipient_email
+    FROM alert_history ah
+    JOIN alert_rules ar ON ah.rule_id = ar.id
+    ORDER BY ah.sent_at DESC
+    LIMIT ?
+"""
+
 def get_alert_history(limit=100):
     """Get alert history with rule details"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         conn.row_factory = sqlite3.Row
         c = conn.cursor()
-        c.execute("""
-            SELECT 
-                ah.*,
-                ar.sensor_type,
-                ar.metric,
-                ar.condition,
-                ar.threshold_value,
-                ar.recipient_email
-            FROM alert_history ah
-            JOIN alert_rules ar ON ah.rule_id = ar.id
-            ORDER BY ah.sent_at DESC
-            LIMIT ?
-        """, (limit,))
+        c.execute(ALERT_HISTORY_QUERY, (limit,))
         return [dict(row) for row in c.fetchall()]
 
+def get_alert_history_json(limit=100):
+    """Get alert history with rule details as a JSON array (see _query_json)"""
+    with _connection() as conn:
+        return _query_json(conn.cursor(), ALERT_HISTORY_QUERY, (limit,))
+
 def get_last_alert_time(rule_id):
     """Get the timestamp of the last alert sent for a specific rule (retorna datetime com BR_TZ)"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         c = conn.cursor()
         c.execute("""
             SELECT sent_at FROM alert_history 
-            WHERE rule_id = ? 
+            WHERE rule_id = ? AND event = 'triggered'
             ORDER BY sent_at DESC 
             LIMIT 1
         """, (rule_id,))
@@ -155,22 +310,232 @@ def get_last_alert_time(rule_id):
             return dt.replace(tzinfo=BR_TZ)
         return None
 
-def get_recent_readings(minutes=1):
-    """Get recent sensor readings from the last N minutes (usa fuso BR para cálculo do cutoff)"""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
+def get_alert_states():
+    """Get the lifecycle state of every rule that has one: {rule_id: {'state', 'since', 'sensor_value', 'cooldown_until'}}
+
+    'since' is the timestamp of the reading that caused the last transition and
+    'cooldown_until' when the last alert's cooldown ends (None on older databases).
+    """
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT rule_id, state, since, sensor_value, cooldown_until FROM alert_state")
+        return {
+            rule_id: {'state': state, 'since': since, 'sensor_value': sensor_value, 'cooldown_until': cooldown_until}
+            for rule_id, state, since, sensor_value, cooldown_until in c.fetchall()
+        }
+
+def set_alert_state(rule_id, state, sensor_value=None, since=None, cooldown_until=None):
+    """Record a rule lifecycle transition ('ok' or 'firing') caused by the reading at `since`; returns the stored state"""
+    since = since or _now_br_str()
+    with _connection() as conn:
         c = conn.cursor()
-        cutoff = (datetime.now(BR_TZ) - timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S")
         c.execute("""
-            SELECT * FROM sistema_info 
+            INSERT OR REPLACE INTO alert_state (rule_id, state, since, sensor_value, cooldown_until)
+            VALUES (?, ?, ?, ?, ?)
+        """, (rule_id, state, since, sensor_value, cooldown_until))
+        conn.commit()
+    return {'state': state, 'since': since, 'sensor_value': sensor_value, 'cooldown_until': cooldown_until}
+
+READING_COLUMNS = ('timestamp', 'cpu', 'ram', 'temperatura', 'potencia')
+METRIC_COLUMNS = READING_COLUMNS[1:]
+
+class ReadingBatch:
+    """Columnar batch of sensor readings
+
+    `timestamps` is a list of strings and `columns` maps each metric to an
+    array('d') aligned with it (NaN marks a missing value). The arrays expose
+    the buffer protocol, so vectorized evaluators can wrap them without copying.
+    """
+    __slots__ = ('timestamps', 'columns')
+    
+    def __init__(self, metrics=METRIC_COLUMNS):
+        self.timestamps = []
+        self.columns = {metric: array('d') for metric in metrics}
+    
+    def __len__(self):
+        return len(self.timestamps)
+    
+    @classmethod
+    def from_rows(cls, rows, metrics=METRIC_COLUMNS):
+        """Build a batch from a list of (timestamp, *metrics) tuples"""
+        batch = cls(metrics)
+        transposed = zip(*rows)
+        timestamps = next(transposed, None)
+        if timestamps is None:
+            return batch
+        batch.timestamps = list(timestamps)
+        for metric, values in zip(metrics, transposed):
+            try:
+                batch.columns[metric] = array('d', values)
+            except TypeError:
+                # Coluna com NULLs: caminho mais lento, só quando necessário
+                batch.columns[metric] = array('d', [NAN if value is None else value for value in values])
+        return batch
+
+def get_recent_reading_batch(minutes=1, metrics=METRIC_COLUMNS):
+    """Get recent readings from the last N minutes as a ReadingBatch (newest first)
+
+    Only timestamp and the requested metric columns are read.
+    """
+    for metric in metrics:
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"invalid column '{metric}'")
+    with _connection() as conn:
+        c = conn.cursor()
+        cutoff = (datetime.now(BR_TZ) - timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S")
+        c.execute(f"""
+            SELECT {', '.join(('timestamp', *metrics))} FROM sistema_info 
             WHERE timestamp >= ?
             ORDER BY timestamp DESC
         """, (cutoff,))
-        return [dict(row) for row in c.fetchall()]
+        return ReadingBatch.from_rows(c.fetchall(), metrics)
+
+def iter_reading_batches(start, end, chunk_size=5000, metrics=METRIC_COLUMNS):
+    """Stream sensor readings between start and end (inclusive, 'YYYY-MM-DD HH:MM:SS' in BR_TZ)
+
+    Yields ReadingBatch chunks in ascending timestamp order, so memory stays
+    bounded by chunk_size regardless of range. Each chunk is its own short query
+    (keyset pagination on timestamp), so no read transaction stays open while the
+    caller evaluates a chunk and SmartLume can keep writing during long replays.
+    """
+    for metric in metrics:
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"invalid column '{metric}'")
+    select = f"SELECT timestamp, {', '.join(metrics)} FROM sistema_info"
+    lower_bound = "timestamp >= :start"
+    params = {'start': start, 'end': end, 'chunk_size': chunk_size}
+    while True:
+        with _connection() as conn:
+            rows = conn.execute(f"""
+                {select} WHERE {lower_bound} AND timestamp <= :end
+                ORDER BY timestamp LIMIT :chunk_size
+            """, params).fetchall()
+            full = len(rows) == chunk_size
+            if full:
+                # O LIMIT pode ter cortado leituras com o mesmo timestamp da última: elas são
+                # relidas por igualdade e o próximo lote começa depois desse timestamp
+                # (desempatar por rowid obrigaria o SQLite a ordenar fora do índice)
+                params['last_timestamp'] = rows[-1][0]
+                while rows and rows[-1][0] == params['last_timestamp']:
+                    rows.pop()
+                rows += conn.execute(f"{select} WHERE timestamp = :last_timestamp", params).fetchall()
+                lower_bound = "timestamp > :last_timestamp"
+        if rows:
+            yield ReadingBatch.from_rows(rows, metrics)
+        if not full:
+            break
+
+def _condition_sql(column, condition):
+    """Build the SQL predicate (and its placeholders) for a rule condition on a reading column"""
+    if column not in METRIC_COLUMNS:
+        raise ValueError(f"invalid column '{column}'")
+    if condition == 'greater_than':
+        return f"{column} > :threshold_value"
+    elif condition == 'less_than':
+        return f"{column} < :threshold_value"
+    elif condition == 'between':
+        return f"{column} BETWEEN :threshold_value AND :threshold_max"
+    elif condition == 'outside':
+        return f"({column} < :threshold_value OR {column} > :threshold_max)"
+    raise ValueError(f"invalid condition '{condition}'")
+
+def _recovery_sql(column, condition):
+    """Build the SQL predicate for a firing rule's recovery (past the :hysteresis margin)"""
+    if column not in METRIC_COLUMNS:
+        raise ValueError(f"invalid column '{column}'")
+    if condition == 'greater_than':
+        return f"{column} < :threshold_value - :hysteresis"
+    elif condition == 'less_than':
+        return f"{column} > :threshold_value + :hysteresis"
+    elif condition == 'between':
+        return f"({column} < :threshold_value - :hysteresis OR {column} > :threshold_max + :hysteresis)"
+    elif condition == 'outside':
+        return f"{column} BETWEEN :threshold_value + :hysteresis AND :threshold_max - :hysteresis"
+    raise ValueError(f"invalid condition '{condition}'")
+
+def preview_alert_rule(column, condition, threshold_value, threshold_max=None, cooldown_minutes=30, hours=24, hysteresis=0, max_alerts=1000):
+    """Preview how a rule would have behaved over the last N hours, computed entirely in SQLite
+
+    Returns the number of readings in the window, how many violate the
+    condition, the peak violating value, and how many alerts (ok -> firing)
+    and recoveries (firing -> ok) the lifecycle and cooldown would have produced.
+    Alerts stop being counted after max_alerts; alerts_capped tells the caller
+    the rule would have fired more often than that.
+    """
+    predicate = _condition_sql(column, condition)
+    recovery = _recovery_sql(column, condition)
+    peak = 'MIN' if condition == 'less_than' else 'MAX'
+    params = {
+        'cutoff': (datetime.now(BR_TZ) - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S"),
+        'threshold_value': threshold_value,
+        'threshold_max': threshold_max,
+        'hysteresis': hysteresis or 0,
+        # Timestamps têm resolução de segundos: sem cooldown, o próximo alerta é no segundo seguinte
+        'cooldown': f"+{int(cooldown_minutes)} minutes" if cooldown_minutes > 0 else "+1 seconds",
+        'max_steps': 2 * max_alerts,
+    }
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            SELECT 
+                (SELECT COUNT(*) FROM sistema_info WHERE timestamp >= :cutoff),
+                COUNT(*),
+                {peak}({column})
+            FROM sistema_info 
+            WHERE timestamp >= :cutoff AND {predicate}
+        """, params)
+        readings, violations, peak_value = c.fetchone()
+        
+        # Eventos alternam entre disparo e resolução: cada disparo "pula" para a primeira
+        # recuperação depois dele, e cada resolução para a primeira violação após ela e após
+        # o fim do cooldown, usando buscas no índice de timestamp em vez de varrer as leituras
+        # no Python. Cada busca tem um único limite de intervalo para o SQLite usá-lo no índice,
+        # e o CASE só avalia a subconsulta do ramo escolhido. Cada passo custa uma busca, então
+        # uma métrica que oscila em torno do limiar com cooldown 0 (dezenas de milhares de
+        # incidentes em 48h) faria a recursão dominar o tempo: ela para em max_alerts disparos
+        # e um passo extra só verifica se haveria mais um.
+        c.execute(f"""
+            WITH RECURSIVE events(kind, ts, fired_at, step) AS (
+                SELECT 'fire', MIN(timestamp), MIN(timestamp), 0 FROM sistema_info 
+                WHERE timestamp >= :cutoff AND {predicate}
+                UNION ALL
+                SELECT 
+                    CASE kind WHEN 'fire' THEN 'resolve' ELSE 'fire' END,
+                    CASE kind 
+                        WHEN 'fire' THEN (
+                            SELECT MIN(timestamp) FROM sistema_info 
+                            WHERE timestamp > events.ts AND {recovery}
+                        )
+                        ELSE (
+                            SELECT MIN(timestamp) FROM sistema_info 
+                            WHERE timestamp >= MAX(events.ts, datetime(events.fired_at, :cooldown)) AND {predicate}
+                        )
+                    END,
+                    CASE kind WHEN 'fire' THEN events.ts END,
+                    events.step + 1
+                FROM events WHERE events.ts IS NOT NULL AND events.step < :max_steps
+            )
+            SELECT 
+                COUNT(CASE WHEN kind = 'fire' AND step < :max_steps THEN ts END),
+                COUNT(CASE WHEN kind = 'resolve' THEN ts END),
+                COUNT(CASE WHEN step = :max_steps THEN ts END)
+            FROM events
+        """, params)
+        alerts, resolved, capped = c.fetchone()
+        
+        return {
+            'hours': hours,
+            'readings': readings,
+            'violations': violations,
+            'peak_value': peak_value,
+            'alerts': alerts,
+            'resolved': resolved,
+            'alerts_capped': bool(capped)
+        }
 
 def get_alert_statistics():
     """Get alert statistics (usa data BR para 'today')"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _connection() as conn:
         conn.row_factory = sqlite3.Row
         c = conn.cursor()
         
@@ -182,15 +547,15 @@ def get_alert_statistics():
         c.execute("SELECT COUNT(*) as active FROM alert_rules WHERE is_active = 1")
         active_rules = c.fetchone()['active']
         
-        # Total alerts sent
-        c.execute("SELECT COUNT(*) as total FROM alert_history")
+        # Total alerts sent (notificações de resolução não contam como alertas)
+        c.execute("SELECT COUNT(*) as total FROM alert_history WHERE event = 'triggered'")
         total_alerts = c.fetchone()['total']
         
         # Alerts sent today (considerando fuso BR)
         today_str = datetime.now(BR_TZ).strftime("%Y-%m-%d")
         c.execute("""
             SELECT COUNT(*) as today FROM alert_history 
-            WHERE DATE(sent_at) = DATE(?)
+            WHERE DATE(sent_at) = DATE(?) AND event = 'triggered'
         """, (today_str,))
         alerts_today = c.fetchone()['today']
         
@@ -199,6 +564,7 @@ def get_alert_statistics():
             SELECT ar.sensor_type, COUNT(ah.id) as count
             FROM alert_history ah
             JOIN alert_rules ar ON ah.rule_id = ar.id
+            WHERE ah.event = 'triggered'
             GROUP BY ar.sensor_type
         """)
         alerts_by_sensor = [dict(row) for row in c.fetchall()]
@@ -0,0 +1,253 @@
+"""
+Teste de carga do AlertSystem em uma única máquina, sem rede externa
+
+Sobe a API em um servidor WSGI multi-thread com o monitor embutido, um escritor
+que simula o SmartLume inserindo leituras em sistema_info, um stub local no
+lugar do EmailJS (com latência e erros injetáveis) e N clientes do dashboard.
+"""
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .db_manager import BR_TZ
+
+DASHBOARD_ENDPOINTS = (
+    '/api/alert-statistics',
+    '/api/alert-rules',
+    '/api/alert-history?limit=50',
+)
+
+# Regras criadas no banco de teste: temperatura alterna entre fases normais e picos
+LOADTEST_RULES = (
+    ('Sistema', 'temperatura', 'greater_than', 80.0, None),
+    ('Sistema', 'cpu', 'greater_than', 95.0, None),
+)
+NORMAL_TEMPERATURE = 50.0
+SPIKE_TEMPERATURE = 95.0
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of a list (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+class _LockCounter(io.TextIOBase):
+    """Stdout replacement that swallows the monitor's prints and counts SQLite lock errors"""
+    
+    def __init__(self):
+        self.lock_errors = 0
+        self.loop_errors = 0
+    
+    def write(self, text):
+        if text.startswith('Error'):
+            self.loop_errors += 1
+            if 'locked' in text:
+                self.lock_errors += 1
+        return len(text)
+
+def start_email_stub(latency_ms=0, error_rate=0.0):
+    """Start a local HTTP server standing in for EMAILJS_API_URL; returns (server, url, received)"""
+    received = []
+    lock = threading.Lock()
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            failed = random.random() < error_rate
+            subject = payload.get('template_params', {}).get('subject', '')
+            with lock:
+                received.append({
+                    'at': time.monotonic(),
+                    'event': 'resolved' if subject.startswith('Resolved') else 'triggered',
+                    'ok': not failed
+                })
+            self.send_response(500 if failed else 200)
+            self.end_headers()
+            self.wfile.write(b'injected failure' if failed else b'OK')
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, name='email-stub', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api/v1.0/email/send", received
+
+def run_writer(db_path, rate, phase_seconds, stop, stats):
+    """Insert readings at `rate` rows/s, alternating normal and spike phases of `phase_seconds`"""
+    conn = sqlite3.connect(db_path)
+    interval = 1.0 / rate
+    next_at = time.monotonic()
+    phase_started = next_at
+    spiking = False
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            if now - phase_started >= phase_seconds:
+                spiking = not spiking
+                phase_started = now
+                if spiking:
+                    stats['incidents'].append(now)
+            temperature = SPIKE_TEMPERATURE if spiking else NORMAL_TEMPERATURE
+            try:
+                conn.execute(
+                    "INSERT INTO sistema_info (timestamp, cpu, ram, temperatura, potencia) VALUES (?, ?, ?, ?, ?)",
+                    (datetime.now(BR_TZ).strftime("%Y-%m-%d %H:%M:%S"),
+                     random.uniform(10, 60), random.uniform(30, 70), temperature, random.uniform(2, 8))
+                )
+                conn.commit()
+                stats['rows'] += 1
+            except sqlite3.OperationalError as e:
+                stats['errors'] += 1
+                if 'locked' in str(e):
+                    stats['lock_errors'] += 1
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+    finally:
+        conn.close()
+
+def run_client(base_url, stop, results):
+    """Poll the dashboard endpoints like the frontend does, recording latency and errors"""
+    index = random.randrange(len(DASHBOARD_ENDPOINTS))
+    while not stop.is_set():
+        endpoint = DASHBOARD_ENDPOINTS[index % len(DASHBOARD_ENDPOINTS)]
+        index += 1
+        request = urllib.request.Request(base_url + endpoint, headers={'Accept-Encoding': 'gzip'})
+        start = time.monotonic()
+        ok, locked = True, False
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            ok = False
+            locked = b'locked' in e.read()
+        except OSError:
+            ok = False
+        results.append((time.monotonic() - start, ok, locked))
+
+def _prepare_database(db_path):
+    """Create sistema_info (normalmente do SmartLume), the alert tables and the load test rules"""
+    from . import db_manager
+    
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sistema_info (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                cpu REAL,
+                ram REAL,
+                temperatura REAL,
+                potencia REAL
+            )
+        """)
+    db_manager.init_alert_tables()
+    for sensor_type, metric, condition, threshold_value, threshold_max in LOADTEST_RULES:
+        db_manager.create_alert_rule(
+            sensor_type, metric, condition, threshold_value, threshold_max, 'loadtest@localhost',
+            cooldown_minutes=0, check_interval_seconds=1, hysteresis=2.0
+        )
+
+def run_loadtest(duration=30, clients=8, write_rate=5, phase_seconds=5, email_latency_ms=200, email_error_rate=0.05):
+    """Run the load test against a throwaway database and return a report dict"""
+    from . import config
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config.configure(os.path.join(tmp, 'loadtest.db'))
+        _prepare_database(config.get_db_path())
+        
+        stub, stub_url, received = start_email_stub(email_latency_ms, email_error_rate)
+        
+        from werkzeug.serving import make_server
+        from . import alert_monitor
+        from .app import app
+        
+        alert_monitor.EMAILJS_API_URL = stub_url
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, name='api', daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        
+        stop = threading.Event()
+        writer_stats = {'rows': 0, 'errors': 0, 'lock_errors': 0, 'incidents': []}
+        client_results = []
+        monitor_output = _LockCounter()
+        
+        with contextlib.redirect_stdout(monitor_output):
+            monitor = alert_monitor.start_embedded_monitor()
+            threads = [threading.Thread(target=run_writer, args=(config.get_db_path(), write_rate, phase_seconds, stop, writer_stats), daemon=True)]
+            threads += [threading.Thread(target=run_client, args=(base_url, stop, client_results), daemon=True) for _ in range(clients)]
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            time.sleep(duration)
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=35)
+            elapsed = time.monotonic() - started
+            alert_monitor.stop_monitor()
+            monitor.join(timeout=email_latency_ms / 1000 + 35)
+        
+        server.shutdown()
+        stub.shutdown()
+        
+        # Latência detecção -> notificação: do primeiro pico gravado até o stub receber o email
+        incidents = writer_stats['incidents']
+        detection = []
+        for email in (email for email in received if email['event'] == 'triggered'):
+            starts = [at for at in incidents if at <= email['at']]
+            if starts:
+                detection.append(email['at'] - starts[-1])
+        
+        latencies = [latency for latency, ok, locked in client_results]
+        return {
+            'duration_s': round(elapsed, 1),
+            'clients': clients,
+            'requests': len(client_results),
+            'throughput_rps': round(len(client_results) / elapsed, 1),
+            'api_p50_ms': _ms(_percentile(latencies, 50)),
+            'api_p99_ms': _ms(_percentile(latencies, 99)),
+            'api_errors': sum(1 for latency, ok, locked in client_results if not ok),
+            'lock_errors': {
+                'api': sum(1 for latency, ok, locked in client_results if locked),
+                'writer': writer_stats['lock_errors'],
+                'monitor': monitor_output.lock_errors,
+            },
+            'writer_rows': writer_stats['rows'],
+            'incidents': len(incidents),
+            'detection_p50_ms': _ms(_percentile(detection, 50)),
+            'detection_p99_ms': _ms(_percentile(detection, 99)),
+            'emails': len(received),
+            'email_success_rate': round(sum(1 for email in received if email['ok']) / len(received), 3) if received else None,
+        }
+
+def print_loadtest_report(report):
+    """Print a load test report in a readable format"""
+    print("=" * 60)
+    print("ALERTSYSTEM - TESTE DE CARGA")
+    print("=" * 60)
+    print(f"Duração: {report['duration_s']}s com {report['clients']} clientes do dashboard")
+    print(f"API: {report['requests']} requisições, {report['throughput_rps']} req/s, "
+          f"p50 {report['api_p50_ms']} ms, p99 {report['api_p99_ms']} ms, {report['api_errors']} erros")
+    locks = report['lock_errors']
+    print(f"Erros de lock do SQLite: API {locks['api']}, escritor {locks['writer']}, monitor {locks['monitor']}")
+    print(f"Escritor: {report['writer_rows']} leituras, {report['incidents']} incidentes simulados")
+    print(f"Detecção -> notificação: p50 {report['detection_p50_ms']} ms, p99 {report['detection_p99_ms']} ms")
+    print(f"Emails: {report['emails']} recebidos pelo stub, taxa de sucesso {report['email_success_rate']}")
+    print("=" * 60)
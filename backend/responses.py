@@ -0,0 +1,55 @@
+"""
+Respostas JSON da API: encoder rápido plugável e compressão gzip negociada
+"""
+import gzip
+import json
+
+from flask import Response, request
+
+# Corpos menores que isso não compensam o custo da compressão
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/csv')
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    _dumps = _stdlib_dumps
+
+def set_json_encoder(dumps):
+    """Plug a JSON encoder (obj -> bytes); None restores the default"""
+    global _dumps
+    _dumps = dumps or _stdlib_dumps
+
+def json_response(payload, status=200):
+    """Serialize a payload with the configured encoder"""
+    return Response(_dumps(payload), status=status, mimetype='application/json')
+
+def raw_data_response(data_json):
+    """Wrap JSON text already produced elsewhere (e.g. by SQLite) in the {'success', 'data'} envelope"""
+    body = b'{"success":true,"data":' + data_json.encode('utf-8') + b'}'
+    return Response(body, mimetype='application/json')
+
+def compress_response(response):
+    """Gzip JSON/CSV bodies above GZIP_MIN_SIZE when the client accepts it (gzip with q > 0)"""
+    if (
+        response.direct_passthrough
+        or response.status_code < 200 or response.status_code >= 300
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    # A resposta depende do Accept-Encoding mesmo quando sai sem compressão (caches)
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings['gzip'] <= 0:
+        return response
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
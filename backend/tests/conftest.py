@@ -0,0 +1,70 @@
+"""
+Fixtures dos testes: cada teste roda contra um banco SQLite temporário
+"""
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import alert_monitor, config, db_manager
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Point the backend at a fresh database with sistema_info (normalmente do SmartLume) and the alert tables"""
+    path = str(tmp_path / 'test.db')
+    config.configure(path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE sistema_info (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                cpu REAL,
+                ram REAL,
+                temperatura REAL,
+                potencia REAL
+            )
+        """)
+    db_manager.init_alert_tables()
+    # Nenhum email sai dos testes: o envio só é registrado
+    sent = []
+    monkeypatch.setattr(alert_monitor, 'send_email_via_emailjs', lambda recipient, subject, message: sent.append(subject) or True)
+    yield path
+    config.configure()
+
+def insert_readings(temperatures, start, step_seconds=1):
+    """Insert one reading per temperature, `step_seconds` apart from `start` (BR_TZ datetime)"""
+    rows = [
+        ((start + timedelta(seconds=i * step_seconds)).strftime("%Y-%m-%d %H:%M:%S"), 20.0, 40.0, temperature, 5.0)
+        for i, temperature in enumerate(temperatures)
+    ]
+    with sqlite3.connect(config.get_db_path()) as conn:
+        conn.executemany(
+            "INSERT INTO sistema_info (timestamp, cpu, ram, temperatura, potencia) VALUES (?, ?, ?, ?, ?)", rows
+        )
+
+def seconds_ago(seconds):
+    return datetime.now(db_manager.BR_TZ) - timedelta(seconds=seconds)
+
+@pytest.fixture
+def run_monitor():
+    """Start monitor_alerts in a thread; it is stopped when the test ends"""
+    threads = []
+
+    def start():
+        alert_monitor._stop.clear()
+        thread = threading.Thread(target=alert_monitor.monitor_alerts, daemon=True)
+        thread.start()
+        threads.append(thread)
+        return thread
+
+    yield start
+    alert_monitor.stop_monitor()
+    for thread in threads:
+        thread.join(timeout=10)
+
+@pytest.fixture
+def client(db):
+    """Flask test client for the API, on the temporary database"""
+    from backend.app import app
+    return app.test_client()
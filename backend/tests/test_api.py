@@ -0,0 +1,104 @@
+"""
+Validação e respostas da API
+"""
+import gzip
+import json
+
+import pytest
+
+from backend import db_manager
+from backend.responses import GZIP_MIN_SIZE
+
+def _create_rules(count):
+    return [
+        db_manager.create_alert_rule('Sistema', 'cpu', 'greater_than', 80.0, None, 'ops@example.com', 30)
+        for _ in range(count)
+    ]
+
+def test_bulk_toggle_rejects_is_active_outside_0_and_1(client):
+    rule_ids = _create_rules(2)
+
+    response = client.patch('/api/alert-rules/bulk/toggle', json={'ids': rule_ids, 'is_active': 5})
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert all(rule['is_active'] == 1 for rule in db_manager.get_all_alert_rules())
+
+@pytest.mark.parametrize('method, url', [
+    ('patch', '/api/alert-rules/bulk/toggle'),
+    ('post', '/api/alert-rules/bulk/delete'),
+])
+def test_bulk_endpoints_answer_json_to_non_json_bodies(client, method, url):
+    response = getattr(client, method)(url, data='ids=1', content_type='text/plain')
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+@pytest.mark.parametrize('field', ['threshold_value', 'threshold_max'])
+def test_preview_rejects_non_finite_thresholds(client, field):
+    payload = {'metric': 'temperatura', 'condition': 'outside', 'threshold_value': 40, 'threshold_max': 70}
+    payload[field] = 'nan'
+
+    response = client.post('/api/alert-rules/preview', json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def _rule_payload(**overrides):
+    payload = {
+        'sensor_type': 'Sistema', 'metric': 'temperatura', 'condition': 'outside',
+        'threshold_value': 40, 'threshold_max': 70, 'recipient_email': 'ops@example.com',
+        'cooldown_minutes': 30, 'hysteresis': 5,
+    }
+    payload.update(overrides)
+    return payload
+
+@pytest.mark.parametrize('overrides', [
+    {'threshold_value': 'nan'},
+    {'threshold_max': 'inf'},
+    # 2 * 15 >= 70 - 40: a recuperação exigiria 55 <= valor <= 55
+    {'hysteresis': 15},
+    {'metric': 'umidade'},
+])
+def test_single_rule_endpoints_validate_like_bulk(client, overrides):
+    created = client.post('/api/alert-rules', json=_rule_payload(**overrides))
+    assert created.status_code == 400
+    assert db_manager.get_all_alert_rules() == []
+
+    rule_id = client.post('/api/alert-rules', json=_rule_payload()).get_json()['rule_id']
+    updated = client.put(f'/api/alert-rules/{rule_id}', json=_rule_payload(**overrides))
+    assert updated.status_code == 400
+    assert db_manager.get_all_alert_rules()[0]['hysteresis'] == 5
+
+def test_preview_rejects_outside_rule_that_never_recovers(client):
+    response = client.post('/api/alert-rules/preview', json=_rule_payload(hysteresis=15))
+
+    assert response.status_code == 400
+    assert 'never recovers' in response.get_json()['error']
+
+@pytest.mark.parametrize('accept_encoding, rule_count, compressed', [
+    ('gzip', 20, True),
+    ('gzip;q=0', 20, False),
+    ('identity', 20, False),
+    # Corpo abaixo de GZIP_MIN_SIZE: não compensa comprimir
+    ('gzip', 1, False),
+])
+def test_rule_list_compression(client, accept_encoding, rule_count, compressed):
+    rule_ids = _create_rules(rule_count)
+
+    response = client.get('/api/alert-rules', headers={'Accept-Encoding': accept_encoding})
+    body = response.get_data()
+
+    assert response.status_code == 200
+    assert 'Accept-Encoding' in response.headers['Vary']
+    if compressed:
+        assert response.headers['Content-Encoding'] == 'gzip'
+        body = gzip.decompress(body)
+    else:
+        assert 'Content-Encoding' not in response.headers
+    assert (len(body) >= GZIP_MIN_SIZE) == (rule_count > 1)
+
+    # Envelope montado em bytes em volta do JSON gerado pelo SQLite
+    payload = json.loads(body)
+    assert payload['success'] is True
+    assert sorted(rule['id'] for rule in payload['data']) == sorted(rule_ids)
@@ -0,0 +1,120 @@
+"""
+Ciclo de vida das regras (ok -> firing -> ok) e concordância entre preview e replay
+"""
+import random
+import time
+
+import pytest
+
+from backend import alert_monitor, db_manager
+
+from .conftest import insert_readings, seconds_ago
+
+def _rule(**overrides):
+    rule = {
+        'sensor_type': 'Sistema', 'metric': 'temperatura', 'condition': 'greater_than',
+        'threshold_value': 80.0, 'threshold_max': None, 'recipient_email': 'ops@example.com',
+        'cooldown_minutes': 0, 'hysteresis': 2.0,
+    }
+    rule.update(overrides)
+    return rule
+
+def _create_rule(**overrides):
+    rule = _rule(**overrides)
+    rule_id = db_manager.create_alert_rule(**rule)
+    return next(r for r in db_manager.get_all_alert_rules() if r['id'] == rule_id)
+
+def _events(rule_id):
+    with db_manager._connection() as conn:
+        return [event for (event,) in conn.execute("SELECT event FROM alert_history WHERE rule_id = ? ORDER BY id", (rule_id,))]
+
+def _check(rule, states):
+    return alert_monitor.check_rule(rule, db_manager.get_recent_reading_batch(minutes=1), states)
+
+def test_incident_costs_one_trigger_and_one_resolve(db):
+    rule = _create_rule()
+    states = {}
+
+    insert_readings([90.0] * 10, seconds_ago(50))
+    _check(rule, states)
+    _check(rule, states)
+    insert_readings([50.0] * 10, seconds_ago(30))
+
+    # Os picos continuam na janela de leitura depois da recuperação: nada pode disparar de novo
+    for _ in range(3):
+        _check(rule, states)
+
+    assert _events(rule['id']) == ['triggered', 'resolved']
+    assert db_manager.get_alert_states()[rule['id']]['state'] == 'ok'
+
+def test_spike_written_while_resolving_fires(db):
+    rule = _create_rule()
+    states = {}
+
+    insert_readings([90.0] * 3, seconds_ago(3))
+    _check(rule, states)
+    time.sleep(1.1)
+    insert_readings([50.0], seconds_ago(0))
+    batch = db_manager.get_recent_reading_batch(minutes=1)
+
+    # Pico gravado entre a leitura do lote e a resolução: tem timestamp anterior ao relógio
+    # da resolução, mas posterior à leitura que resolveu, e precisa disparar na próxima verificação
+    time.sleep(1.1)
+    insert_readings([90.0], seconds_ago(0))
+    alert_monitor.check_rule(rule, batch, states)
+    _check(rule, states)
+
+    assert _events(rule['id']) == ['triggered', 'resolved', 'triggered']
+
+def test_check_matches_replay(db):
+    # Segundo pico dentro do cooldown contado a partir da leitura que disparou: não dispara
+    rule = _create_rule(cooldown_minutes=1)
+    insert_readings([90.0] * 3 + [50.0] * 3 + [90.0] * 3 + [50.0] * 3, seconds_ago(20))
+    _check(rule, {})
+
+    replay = alert_monitor.replay_alerts('2000-01-01 00:00:00', '2100-01-01 00:00:00', rules=[rule])['rules'][0]
+    assert _events(rule['id']) == ['triggered', 'resolved']
+    assert (replay['alerts_count'], replay['resolved_count']) == (1, 1)
+    assert db_manager.get_alert_states()[rule['id']]['cooldown_until'] is not None
+
+@pytest.mark.parametrize('cooldown_minutes', [0, 1, 30])
+@pytest.mark.parametrize('condition, threshold_value, threshold_max, hysteresis', [
+    ('greater_than', 70.0, None, 0.0),
+    ('greater_than', 70.0, None, 3.0),
+    ('less_than', 45.0, None, 2.0),
+    ('outside', 45.0, 70.0, 1.0),
+])
+def test_preview_matches_replay(db, cooldown_minutes, condition, threshold_value, threshold_max, hysteresis):
+    random.seed(7)
+    # 2h de leituras a cada 10s, com episódios de alta temperatura
+    temperatures = [
+        random.uniform(40, 60) + (25 if (i // 60) % 4 == 0 else 0)
+        for i in range(720)
+    ]
+    insert_readings(temperatures, seconds_ago(2 * 3600 + 60), step_seconds=10)
+    rule = _rule(condition=condition, threshold_value=threshold_value, threshold_max=threshold_max,
+                 cooldown_minutes=cooldown_minutes, hysteresis=hysteresis)
+
+    preview = db_manager.preview_alert_rule(
+        'temperatura', condition, threshold_value, threshold_max, cooldown_minutes, hours=3, hysteresis=hysteresis
+    )
+    replay = alert_monitor.replay_alerts('2000-01-01 00:00:00', '2100-01-01 00:00:00', rules=[rule])['rules'][0]
+
+    assert preview['alerts'] > 0
+    assert preview['violations'] == replay['violations']
+    assert preview['peak_value'] == replay['peak_value']
+    assert preview['alerts'] == replay['alerts_count']
+    assert preview['resolved'] == replay['resolved_count']
+
+def test_preview_caps_alerts(db):
+    # Métrica oscilando a cada leitura com cooldown 0: um incidente a cada 2 leituras
+    insert_readings([90.0, 50.0] * 30, seconds_ago(120))
+
+    full = db_manager.preview_alert_rule('temperatura', 'greater_than', 80.0, cooldown_minutes=0, hours=1)
+    exact = db_manager.preview_alert_rule('temperatura', 'greater_than', 80.0, cooldown_minutes=0, hours=1, max_alerts=30)
+    capped = db_manager.preview_alert_rule('temperatura', 'greater_than', 80.0, cooldown_minutes=0, hours=1, max_alerts=10)
+
+    assert (full['alerts'], full['resolved'], full['alerts_capped']) == (30, 30, False)
+    assert (exact['alerts'], exact['resolved'], exact['alerts_capped']) == (30, 30, False)
+    assert (capped['alerts'], capped['resolved'], capped['alerts_capped']) == (10, 10, True)
+    assert capped['violations'] == 30
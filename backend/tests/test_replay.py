@@ -0,0 +1,33 @@
+"""
+Leitura em lotes do replay e limites do endpoint
+"""
+import random
+from datetime import datetime
+
+import pytest
+
+from backend import db_manager
+
+from .conftest import insert_readings
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 50, 5000])
+def test_reading_batches_keep_every_reading_across_tied_timestamps(db, chunk_size):
+    random.seed(3)
+    start = datetime(2026, 1, 1, tzinfo=db_manager.BR_TZ)
+    # Vários segundos com mais de uma leitura, para que o LIMIT corte grupos com o mesmo timestamp
+    for second in range(120):
+        insert_readings([float(second)] * random.choice([1, 2, 3, 7]), start.replace(minute=second // 60, second=second % 60), step_seconds=0)
+    expected = db_manager.iter_reading_batches('2026-01-01 00:00:00', '2026-01-01 00:01:59', chunk_size=10 ** 6)
+    expected = [(t, v) for batch in expected for t, v in zip(batch.timestamps, batch.columns['temperatura'])]
+
+    batches = list(db_manager.iter_reading_batches('2026-01-01 00:00:00', '2026-01-01 00:01:59', chunk_size=chunk_size))
+    readings = [(t, v) for batch in batches for t, v in zip(batch.timestamps, batch.columns['temperatura'])]
+
+    assert sorted(readings) == sorted(expected)
+    assert [t for t, _ in readings] == sorted(t for t, _ in readings)
+
+def test_replay_endpoint_caps_the_range(client):
+    response = client.post('/api/alert-rules/replay', json={'start': '2026-01-01 00:00:00', 'end': '2026-01-09 00:00:00'})
+
+    assert response.status_code == 400
+    assert 'days' in response.get_json()['error']
@@ -0,0 +1,80 @@
+"""
+Agendamento de regras no monitor_alerts
+"""
+import sqlite3
+import time
+
+import pytest
+
+from backend import alert_monitor, db_manager
+
+from .conftest import insert_readings, seconds_ago
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+@pytest.mark.parametrize('module, name', [
+    (db_manager, 'get_recent_reading_batch'),
+    (alert_monitor, 'check_rule'),
+])
+def test_rule_stays_scheduled_after_transient_error(db, run_monitor, monkeypatch, module, name):
+    db_manager.create_alert_rule('Sistema', 'temperatura', 'greater_than', 80.0, None, 'ops@example.com',
+                                 cooldown_minutes=0, check_interval_seconds=1)
+    insert_readings([50.0] * 5, seconds_ago(5))
+
+    real = getattr(module, name)
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(module, name, flaky)
+    run_monitor()
+
+    # A regra de 1s continua sendo verificada depois do erro (antes ela saía da fila para sempre)
+    assert _wait_for(lambda: len(calls) >= 3)
+    assert calls[2] - calls[0] < 4
+
+def test_long_interval_reads_readings_since_last_check(db, run_monitor, monkeypatch):
+    db_manager.create_alert_rule('Sistema', 'temperatura', 'greater_than', 80.0, None, 'ops@example.com',
+                                 cooldown_minutes=0, check_interval_seconds=2)
+    windows = []
+    real = db_manager.get_recent_reading_batch
+
+    def recording(minutes=1, **kwargs):
+        windows.append(minutes)
+        return real(minutes=minutes, **kwargs)
+
+    monkeypatch.setattr(db_manager, 'get_recent_reading_batch', recording)
+    run_monitor()
+
+    # A janela cobre o tempo desde a última verificação, além da janela configurada
+    assert _wait_for(lambda: len(windows) >= 2)
+    assert windows[0] == alert_monitor.READING_WINDOW_MINUTES
+    assert windows[1] >= alert_monitor.READING_WINDOW_MINUTES + 2 / 60
+
+def test_monitor_reads_only_the_due_rules_metrics(db, run_monitor, monkeypatch):
+    db_manager.create_alert_rule('Sistema', 'temperatura', 'greater_than', 80.0, None, 'ops@example.com',
+                                 cooldown_minutes=0, check_interval_seconds=1)
+    db_manager.create_alert_rule('Sistema', 'cpu', 'greater_than', 90.0, None, 'ops@example.com',
+                                 cooldown_minutes=0, check_interval_seconds=1)
+    projections = []
+    real = db_manager.get_recent_reading_batch
+
+    def recording(minutes=1, metrics=db_manager.METRIC_COLUMNS):
+        projections.append(list(metrics))
+        return real(minutes=minutes, metrics=metrics)
+
+    monkeypatch.setattr(db_manager, 'get_recent_reading_batch', recording)
+    run_monitor()
+
+    assert _wait_for(lambda: projections)
+    assert projections[0] == ['cpu', 'temperatura']
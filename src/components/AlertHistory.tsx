@@ -13,6 +13,7 @@ interface AlertHistoryItem {
     message: string;
     sent_at: string;
     email_status: string;
+    event: string;
     sensor_type: string;
     metric: string;
     condition: string;
@@ -112,6 +113,9 @@ export default function AlertHistory({ refreshTrigger }: AlertHistoryProps) {
                             <Badge variant={item.email_status === 'sent' ? 'default' : 'destructive'}>
                                 {item.email_status === 'sent' ? 'Enviado' : 'Falhou'}
                             </Badge>
+                            {item.event === 'resolved' && (
+                                <Badge variant="secondary">Resolvido</Badge>
+                            )}
                         </div>
 
                         <div className="text-sm text-slate-600 space-y-1">
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
@@ -15,6 +15,18 @@ interface AlertRuleData {
     threshold_max: number | string;
     recipient_email: string;
     cooldown_minutes: number;
+    check_interval_seconds?: number | string;
+    hysteresis?: number | string;
+}
+
+interface RulePreview {
+    hours: number;
+    readings: number;
+    violations: number;
+    peak_value: number | null;
+    alerts: number;
+    resolved: number;
+    alerts_capped: boolean;
 }
 
 interface AlertRuleFormProps {
@@ -34,8 +46,52 @@ export default function AlertRuleForm({ onRuleCreated, initialData, ruleId }: Al
         threshold_max: initialData?.threshold_max || '',
         recipient_email: initialData?.recipient_email || '',
         cooldown_minutes: initialData?.cooldown_minutes || 30,
+        check_interval_seconds: initialData?.check_interval_seconds || '',
+        hysteresis: initialData?.hysteresis || '',
     });
 
+    const [preview, setPreview] = useState<RulePreview | null>(null);
+
+    // Prévia da regra nas últimas 24h, recalculada enquanto o usuário digita
+    useEffect(() => {
+        const needsMax = formData.condition === 'between' || formData.condition === 'outside';
+        if (formData.threshold_value === '' || (needsMax && formData.threshold_max === '')) {
+            setPreview(null);
+            return;
+        }
+
+        const controller = new AbortController();
+        const timeout = setTimeout(async () => {
+            try {
+                const response = await fetch(getApiUrl('/api/alert-rules/preview'), {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        metric: formData.metric,
+                        condition: formData.condition,
+                        threshold_value: formData.threshold_value,
+                        threshold_max: needsMax ? formData.threshold_max : null,
+                        cooldown_minutes: formData.cooldown_minutes,
+                        hysteresis: formData.hysteresis,
+                        hours: 24,
+                    }),
+                    signal: controller.signal,
+                });
+                const data = await response.json();
+                setPreview(data.success ? data.data : null);
+            } catch (error) {
+                if (!controller.signal.aborted) {
+                    setPreview(null);
+                }
+            }
+        }, 300);
+
+        return () => {
+            clearTimeout(timeout);
+            controller.abort();
+        };
+    }, [formData.metric, formData.condition, formData.threshold_value, formData.threshold_max, formData.cooldown_minutes, formData.hysteresis]);
+
     const handleSubmit = async (e: React.FormEvent) => {
         e.preventDefault();
         setLoading(true);
@@ -72,6 +128,8 @@ export default function AlertRuleForm({ onRuleCreated, initialData, ruleId }: Al
                         threshold_max: '',
                         recipient_email: '',
                         cooldown_minutes: 30,
+                        check_interval_seconds: '',
+                        hysteresis: '',
                     });
                 }
 
@@ -199,8 +257,49 @@ export default function AlertRuleForm({ onRuleCreated, initialData, ruleId }: Al
                         Tempo mínimo entre alertas para evitar spam
                     </p>
                 </div>
+
+                <div className="space-y-2">
+                    <Label htmlFor="check_interval_seconds">Intervalo de verificação (segundos)</Label>
+                    <Input
+                        id="check_interval_seconds"
+                        type="number"
+                        min="1"
+                        value={formData.check_interval_seconds}
+                        onChange={(e) => setFormData({ ...formData, check_interval_seconds: e.target.value })}
+                        placeholder="Padrão do monitor"
+                    />
+                    <p className="text-xs text-slate-500">
+                        Regras críticas podem ser verificadas com mais frequência
+                    </p>
+                </div>
+
+                <div className="space-y-2">
+                    <Label htmlFor="hysteresis">Margem de recuperação</Label>
+                    <Input
+                        id="hysteresis"
+                        type="number"
+                        step="0.01"
+                        min="0"
+                        value={formData.hysteresis}
+                        onChange={(e) => setFormData({ ...formData, hysteresis: e.target.value })}
+                        placeholder="0"
+                    />
+                    <p className="text-xs text-slate-500">
+                        Quanto o valor precisa voltar além do limite para o alerta ser considerado resolvido
+                    </p>
+                </div>
             </div>
 
+            {preview && (
+                <p className="text-sm text-slate-500">
+                    Nas últimas {preview.hours}h: {preview.violations} de {preview.readings} leituras violariam
+                    esta regra
+                    {preview.peak_value !== null && ` (pico: ${preview.peak_value.toFixed(2)})`}, gerando{' '}
+                    {preview.alerts_capped && 'mais de '}{preview.alerts} {preview.alerts === 1 ? 'alerta' : 'alertas'} e {preview.resolved}{' '}
+                    {preview.resolved === 1 ? 'recuperação' : 'recuperações'} com o cooldown atual.
+                </p>
+            )}
+
             <Button type="submit" disabled={loading} className="w-full md:w-auto">
                 {loading && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
                 {ruleId ? 'Atualizar Regra' : 'Criar Regra'}
@@ -26,6 +26,7 @@ interface AlertRule {
     threshold_max: number | null;
     recipient_email: string;
     cooldown_minutes: number;
+    check_interval_seconds: number | null;
     is_active: number;
     created_at: string;
 }
@@ -174,6 +175,11 @@ export default function AlertRulesList({ refreshTrigger, onRuleUpdated }: AlertR
                             <p>
                                 <span className="font-medium">Cooldown:</span> {rule.cooldown_minutes} minutos
                             </p>
+                            {rule.check_interval_seconds && (
+                                <p>
+                                    <span className="font-medium">Verificação:</span> a cada {rule.check_interval_seconds} segundos
+                                </p>
+                            )}
                         </div>
                     </div>
 